@@ -0,0 +1,301 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import struct
+import time
+import tracemalloc
+from tools import SaveReader, SaveWriter, SAVE_SECTIONS
+from export import writeJson
+from generator import generateSave
+
+
+def _unitSections(unit_count) -> bytes:
+    # Builds the unit block read by readAllUnitData with every unit present in every section
+    data = bytearray()
+    ids = range(unit_count)
+
+    data += struct.pack('<i', unit_count)
+    for unit_id in ids:
+        data += struct.pack('<iiifffffffii???', unit_id, 0, 0, 1, 2, 3, 0, 0, 0, 1, 1, 0, False, False, False)
+
+    data += struct.pack('<i', unit_count)
+    for unit_id in ids:
+        data += struct.pack('<ib', unit_id, 4) + b'Unit'
+
+    data += struct.pack('<i', unit_count)
+    for unit_id in ids:
+        data += struct.pack('<iif??fi', unit_id, 0, 100, False, False, 1, 0)
+
+    data += struct.pack('<i', unit_count)
+    for unit_id in ids:
+        data += struct.pack('<iii', unit_id, 0, 0)
+
+    data += struct.pack('<i', unit_count)
+    for unit_id in ids:
+        data += struct.pack('<if', unit_id, 1)
+
+    data += struct.pack('<i', unit_count)
+    for unit_id in ids:
+        data += struct.pack('<i', unit_id)
+
+    data += struct.pack('<i', unit_count)
+    for unit_id in ids:
+        data += struct.pack('<ii', unit_id, 0)
+
+    data += struct.pack('<i', unit_count)
+    for unit_id in ids:
+        data += struct.pack('<if', unit_id, 1)
+
+    data += struct.pack('<i', unit_count)
+    for unit_id in ids:
+        data += struct.pack('<iiii', unit_id, 1, 5000, 1)
+
+    data += struct.pack('<i', unit_count)
+    for unit_id in ids:
+        data += struct.pack('<iBBf', unit_id, 1, 0, 1)
+
+    data += struct.pack('<i', unit_count)
+    for unit_id in ids:
+        data += struct.pack('<iiif', unit_id, 1, 0, 1)
+
+    data += struct.pack('<i', unit_count)
+    for unit_id in ids:
+        data += struct.pack('<iffff', unit_id, 0, 0, 0, 0)
+
+    data += struct.pack('<i', unit_count)
+    for unit_id in ids:
+        data += struct.pack('<i?ff', unit_id, False, 0, 100)
+    return bytes(data)
+
+
+def benchmarkUnitJoin(unit_counts=(1000, 2000, 4000, 8000, 16000, 32000)):
+    for unit_count in unit_counts:
+        data = _unitSections(unit_count)
+        start = time.perf_counter()
+        SaveReader(data).readAllUnitData()
+        elapsed = time.perf_counter() - start
+        print(f'{unit_count:>7} units  {elapsed * 1000:9.2f} ms  {elapsed / unit_count * 1e6:6.2f} us/unit')
+
+
+def _legacyRead7BitInt(data, position) -> tuple:
+    # String based decoder used before read7BitInt was rewritten, kept for comparison
+    byte_list = []
+    while len(byte_list) <= 5:
+        byte = data[position:position+1]
+        byte_list.insert(0, '{:08b}'.format(int(byte.hex(), 16)))
+        position += 1
+        if byte_list[0][0] == '0':
+            break
+
+    binary_number = ''
+    for count, byte in enumerate(byte_list):
+        byte = byte[1:]
+        if count == 0:
+            byte = byte.lstrip('0')
+        binary_number += byte
+
+    if binary_number != '':
+        number = int(binary_number, 2)
+    else:
+        number = 0
+    return number, position
+
+
+class _StringPositionReader(SaveReader):
+    def __init__(self, data):
+        super().__init__(data)
+        self.string_positions = []
+
+    def readString(self) -> str:
+        self.string_positions.append(self.position)
+        return super().readString()
+
+
+def benchmark7BitInt(save_glob='saves/*.dat', repeat=20):
+    for save_file in sorted(glob.glob(save_glob)):
+        with open(save_file, 'rb') as f:
+            data = f.read()
+        reader = _StringPositionReader(data)
+        reader.readSave()
+        positions = reader.string_positions
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for position in positions:
+                _legacyRead7BitInt(data, position)
+        legacy = time.perf_counter() - start
+
+        reader = SaveReader(data)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for position in positions:
+                reader.position = position
+                reader.read7BitInt()
+        current = time.perf_counter() - start
+
+        print(f'{save_file:<32} {len(positions):>6} strings  legacy {legacy * 1000:8.2f} ms  current {current * 1000:8.2f} ms')
+
+
+def _offsetUnitIds(name, record, offset):
+    if name == 'units':
+        return dict(record, id=record['id'] + offset)
+    if name == 'cloaked_units':
+        return record + offset
+    return dict(record, unit_id=record['unit_id'] + offset)
+
+
+def scaleSave(data, factor) -> bytes:
+    # Repeats every record list of a save factor times, with unit ids shifted so they stay unique
+    reader = SaveReader(data)
+    save = reader.readSave(raw=True)
+    remaining = reader.readRemaining()
+
+    scaled = dict(save)
+    for name in ('sectors', 'factions', 'patrol_paths', 'faction_relations', 'faction_opinions'):
+        scaled[name] = save[name] * factor
+
+    units = save['units']
+    id_step = max([unit['id'] for unit in units['units']], default=0) + 1
+    scaled['units'] = {name: [] for name in units}
+    for copy in range(factor):
+        for name, records in units.items():
+            scaled['units'][name].extend(_offsetUnitIds(name, record, copy * id_step) for record in records)
+    return SaveWriter(len(data) * factor).writeSave(scaled, remaining, raw=True)
+
+
+def _sectionRecords(value) -> int:
+    return len(value) if isinstance(value, list) else 1
+
+
+def benchmarkSections(data, repeat=3) -> dict:
+    # Best of repeat wall times per section, then one traced pass for peak memory
+    sections = {name: {'seconds': float('inf')} for name, _ in SAVE_SECTIONS}
+    for _ in range(repeat):
+        reader = SaveReader(data)
+        for name, method in SAVE_SECTIONS:
+            start_position = reader.position
+            start = time.perf_counter()
+            value = getattr(reader, method)()
+            elapsed = time.perf_counter() - start
+            section = sections[name]
+            section['seconds'] = min(section['seconds'], elapsed)
+            section['bytes'] = reader.position - start_position
+            section['records'] = _sectionRecords(value)
+
+    tracemalloc.start()
+    reader = SaveReader(data)
+    kept = []
+    for name, method in SAVE_SECTIONS:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        kept.append(getattr(reader, method)())
+        sections[name]['peak_memory'] = tracemalloc.get_traced_memory()[1] - before
+    total_peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    for section in sections.values():
+        seconds = section['seconds']
+        section['records_per_second'] = section['records'] / seconds if seconds else None
+        section['mb_per_second'] = section['bytes'] / seconds / 1e6 if seconds else None
+
+    total_seconds = sum(section['seconds'] for section in sections.values())
+    return {
+        'bytes': len(data),
+        'seconds': total_seconds,
+        'mb_per_second': len(data) / total_seconds / 1e6,
+        'peak_memory': total_peak_memory,
+        'sections': sections,
+    }
+
+
+def _printSections(label, result):
+    print(f"{label}  {result['bytes'] / 1e6:.2f} MB  {result['seconds'] * 1000:.2f} ms  "
+          f"{result['mb_per_second']:.2f} MB/s  peak {result['peak_memory'] / 1e6:.2f} MB")
+    for name, section in result['sections'].items():
+        records_per_second = section['records_per_second'] or 0
+        mb_per_second = section['mb_per_second'] or 0
+        print(f"  {name:<20} {section['seconds'] * 1000:9.3f} ms {section['records']:>8} records "
+              f"{records_per_second:>12.0f} rec/s {mb_per_second:8.2f} MB/s {section['peak_memory'] / 1e6:8.2f} MB peak")
+
+
+def benchmarkSaves(save_files, scale_file=None, scales=(), repeat=3) -> list:
+    results = []
+    for save_file in save_files:
+        with open(save_file, 'rb') as f:
+            data = f.read()
+        result = benchmarkSections(data, repeat)
+        result['save_file'] = save_file
+        result['scale'] = 1
+        _printSections(save_file, result)
+        results.append(result)
+
+    if scale_file is not None:
+        with open(scale_file, 'rb') as f:
+            data = f.read()
+        for scale in scales:
+            result = benchmarkSections(scaleSave(data, scale), repeat)
+            result['save_file'] = scale_file
+            result['scale'] = scale
+            _printSections(f'{scale_file} x{scale}', result)
+            results.append(result)
+    return results
+
+
+def benchmarkGenerated(unit_counts, seed=0) -> list:
+    # Times readAllUnitData and the JSON export on generated saves of growing size
+    results = []
+    for unit_count in unit_counts:
+        save = generateSave(seed=seed, units=unit_count, cargo=unit_count // 5, shields=unit_count * 3 // 10, active_units=unit_count // 10)
+        data = SaveWriter().writeSave(save, raw=True)
+
+        reader = SaveReader(data)
+        for _, method in SAVE_SECTIONS[:-1]:
+            getattr(reader, method)()
+        start = time.perf_counter()
+        reader.readAllUnitData()
+        unit_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as f:
+            writeJson(SaveReader(data), f)
+        json_seconds = time.perf_counter() - start
+
+        print(f'{unit_count:>8} units {len(data) / 1e6:8.2f} MB  readAllUnitData {unit_seconds * 1000:9.2f} ms  '
+              f'JSON export {json_seconds * 1000:9.2f} ms')
+        results.append({'units': unit_count, 'bytes': len(data), 'unit_seconds': unit_seconds, 'json_seconds': json_seconds})
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark save decoding per section')
+    parser.add_argument('saves', nargs='*', help='save files to time (default: saves/*.dat)')
+    parser.add_argument('--scale-file', default='saves/AutoSave0.dat', help='save used to build scaled saves')
+    parser.add_argument('--scales', type=int, nargs='*', default=[2, 5, 10], help='scale factors for the scaled saves')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per save, the fastest is reported')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--label', default='', help='label stored with the results, e.g. a version or commit')
+    parser.add_argument('--generated', type=int, nargs='*', default=[], help='unit counts of generated saves to time')
+    parser.add_argument('--micro', action='store_true', help='also run the unit join and 7 bit int benchmarks')
+    args = parser.parse_args()
+
+    save_files = args.saves or sorted(glob.glob('saves/*.dat'))
+    scale_file = args.scale_file if args.scales and os.path.exists(args.scale_file) else None
+    results = benchmarkSaves(save_files, scale_file, args.scales, args.repeat)
+    generated = benchmarkGenerated(args.generated)
+
+    if args.micro:
+        benchmarkUnitJoin()
+        benchmark7BitInt()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'label': args.label,
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'results': results,
+                'generated': generated,
+            }, f, indent=2)
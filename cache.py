@@ -0,0 +1,133 @@
+import hashlib
+import inspect
+import os
+import pickle
+import gameids
+import schema
+import tools
+from tools import SaveReader
+
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')),
+    'interstellar-pilot-savegame-reader',
+)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_versions = {}
+
+
+def readerVersion(reader_class=SaveReader) -> str:
+    # Hash of the code and GameIDs the decoded saves depend on, so any change to
+    # the reader, the record layouts or the projectile classes gives new cache keys
+    if reader_class in _versions:
+        return _versions[reader_class]
+
+    paths = {module.__file__ for module in (tools, schema, gameids)}
+    paths.add(os.path.join(gameids.GAME_IDS_DIR, 'Unit.json'))
+    for cls in reader_class.__mro__:
+        module = inspect.getmodule(cls)
+        if module is not None and hasattr(module, '__file__'):
+            paths.add(module.__file__)
+
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(reader_class.__qualname__.encode())
+    digest.update(pickle.format_version.encode())
+    for path in sorted(paths):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    _versions[reader_class] = digest.hexdigest()
+    return _versions[reader_class]
+
+
+# Decoded saves pickled to cache_dir, keyed by the hash of the save file and the
+# reader version. Entries are evicted least recently used first once they take up
+# more than max_bytes, e.g.
+#   cache = SaveCache()
+#   save = cache.readSave('saves/AutoSave0.dat')
+class SaveCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, reader_class=SaveReader):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.reader_class = reader_class
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def entryPath(self, data, raw=False) -> str:
+        file_hash = hashlib.blake2b(data, digest_size=16).hexdigest()
+        mode = 'raw' if raw else 'merged'
+        return os.path.join(self.cache_dir, f'{file_hash}-{readerVersion(self.reader_class)}-{mode}.pickle')
+
+    def readSave(self, path, raw=False) -> dict:
+        # With raw the tail after the decoded sections is kept under 'remaining'
+        with open(path, 'rb') as f:
+            data = f.read()
+        return self.decode(data, raw)
+
+    def decode(self, data, raw=False) -> dict:
+        entry_path = self.entryPath(data, raw)
+        try:
+            with open(entry_path, 'rb') as f:
+                save = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError, ImportError):
+            # Missing, truncated, or pickled by a version whose classes are gone
+            save = None
+
+        if save is not None:
+            self.hits += 1
+            # The modification time orders the entries for eviction, another process
+            # may have evicted the entry since it was loaded
+            try:
+                os.utime(entry_path)
+            except OSError:
+                pass
+            return save
+
+        self.misses += 1
+        reader = self.reader_class(data)
+        save = reader.readSave(raw=raw)
+        if raw:
+            save['remaining'] = reader.readRemaining()
+        self._store(entry_path, save)
+        return save
+
+    def _store(self, entry_path, save):
+        # Written under a temporary name first so a reader never sees a partial entry
+        temp_path = f'{entry_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as f:
+            pickle.dump(save, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, entry_path)
+        self.evict()
+
+    def entries(self) -> list:
+        # (modification time, size, path) of every entry, oldest first
+        entries = []
+        with os.scandir(self.cache_dir) as scan:
+            for entry in scan:
+                if entry.name.endswith('.pickle'):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        # Evicted by another process
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        entries.sort()
+        return entries
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        # The newest entry is always kept, even when it is larger than max_bytes
+        for _, size, path in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.remove(path)
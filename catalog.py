@@ -0,0 +1,218 @@
+import argparse
+import json
+import operator
+import os
+import re
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from main import findSaves
+from tools import SaveReader
+
+
+# Enough for the header of any save seen so far, longer headers are read again in full
+HEADER_BYTES = 4096
+
+# Columns of the table printed by the command line
+COLUMNS = ['timestamp', 'player_name', 'player_sector_name', 'credits', 'save_number', 'version', 'save_file']
+
+_OPERATORS = {
+    '=': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+_CONDITION = re.compile(r'^(\w+)\s*(!=|<=|>=|=|<|>)\s*(.*)$')
+
+
+def _endOfData(error) -> bool:
+    # Whether error comes from a header that continues past the end of the data read
+    if isinstance(error, struct.error):
+        return True
+    if isinstance(error, UnicodeDecodeError):
+        # A multi byte character cut off where a string was sliced short
+        return error.reason == 'unexpected end of data'
+    return str(error).startswith('Unexpected end of data')
+
+
+def readSaveHeader(path, stat=None) -> dict:
+    # The header of one save with its path, size and modification time, read from
+    # the first HEADER_BYTES of the file. A header that runs past them is read again
+    # at twice the size, up to the whole file, other errors are raised as they are.
+    # Saves without a player have None for the player fields so every entry has the
+    # same keys.
+    if stat is None:
+        stat = os.stat(path)
+    size = min(HEADER_BYTES, stat.st_size)
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(size)
+            reader = SaveReader(data)
+            try:
+                header = reader.readHeader()
+            except Exception as e:
+                if not _endOfData(e):
+                    raise
+                if size >= stat.st_size:
+                    raise Exception('Unexpected end of data in header') from e
+            else:
+                # A string cut off at the end of data is sliced short without an error
+                if reader.position <= len(data):
+                    break
+                if size >= stat.st_size:
+                    raise Exception('Unexpected end of data in header')
+            f.seek(0)
+            size = min(2 * size, stat.st_size)
+
+    entry = {'save_file': path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    entry.update(header)
+    for name in ('player_sector_name', 'player_name', 'credits'):
+        entry.setdefault(name, None)
+    return entry
+
+
+def parseCondition(condition):
+    # 'credits>=1000' to (field, operator, value). The value is parsed as JSON when
+    # it can be, so numbers and true/false compare as such, otherwise it is a string.
+    match = _CONDITION.match(condition)
+    if match is None:
+        raise ValueError(f'invalid condition {condition!r}, expected field, an operator out of {" ".join(_OPERATORS)} and a value')
+    name, op, value = match.groups()
+    try:
+        value = json.loads(value)
+    except ValueError:
+        pass
+    return name, _OPERATORS[op], value
+
+
+def filterEntries(entries, conditions) -> list:
+    # Entries matching every condition from parseCondition. Entries without the field,
+    # or with a value that does not compare to the condition's, do not match.
+    matched = []
+    for entry in entries:
+        for name, op, value in conditions:
+            field = entry.get(name)
+            try:
+                if field is None or not op(field, value):
+                    break
+            except TypeError:
+                break
+        else:
+            matched.append(entry)
+    return matched
+
+
+def sortEntries(entries, name, reverse=False) -> list:
+    # Entries without the field go last
+    present = [entry for entry in entries if entry.get(name) is not None]
+    missing = [entry for entry in entries if entry.get(name) is None]
+    return sorted(present, key=operator.itemgetter(name), reverse=reverse) + missing
+
+
+# Headers of many saves, read on a thread pool. With catalog_file the headers are
+# kept in a JSON file and a save is only read again when its size or modification
+# time changes, e.g.
+#   catalog = SaveCatalog('catalog.json')
+#   entries = catalog.scan(findSaves(['saves/']))
+#   sortEntries(filterEntries(entries, [parseCondition('credits>1000')]), 'timestamp')
+class SaveCatalog:
+    def __init__(self, catalog_file=None, workers=None):
+        self.catalog_file = catalog_file
+        self.workers = workers
+        self.entries = {}
+        # Saves read and saves that failed in the last scan
+        self.read = 0
+        self.failed = 0
+        if catalog_file is not None and os.path.exists(catalog_file):
+            with open(catalog_file) as f:
+                self.entries = {entry['save_file']: entry for entry in json.load(f)}
+
+    def write(self):
+        # Written under a temporary name first so an interrupted write keeps the old catalog
+        temp_path = f'{self.catalog_file}.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(list(self.entries.values()), f, indent=1)
+        os.replace(temp_path, self.catalog_file)
+
+    def _changed(self, save_files) -> list:
+        # (path, stat) of the saves that are not in the catalog or changed since
+        changed = []
+        for path in save_files:
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                print(f'FAILED {path}: {type(e).__name__}: {e}', file=sys.stderr)
+                self.failed += 1
+                continue
+            entry = self.entries.get(path)
+            if entry is None or (entry['size'], entry['mtime_ns']) != (stat.st_size, stat.st_mtime_ns):
+                changed.append((path, stat))
+        return changed
+
+    def scan(self, save_files) -> list:
+        # Entries of save_files in the given order. Saves that cannot be read are
+        # printed and left out, and saves no longer in save_files are dropped from
+        # the catalog.
+        save_files = [os.path.abspath(path) for path in save_files]
+        self.failed = 0
+        changed = self._changed(save_files)
+        self.read = len(changed)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [(path, executor.submit(readSaveHeader, path, stat)) for path, stat in changed]
+            for path, future in futures:
+                try:
+                    self.entries[path] = future.result()
+                except Exception as e:
+                    print(f'FAILED {path}: {type(e).__name__}: {e}', file=sys.stderr)
+                    self.entries.pop(path, None)
+                    self.failed += 1
+
+        self.entries = {path: self.entries[path] for path in save_files if path in self.entries}
+        if self.catalog_file is not None:
+            self.write()
+        return list(self.entries.values())
+
+
+def formatEntries(entries, columns=COLUMNS) -> str:
+    rows = [columns] + [['' if entry.get(name) is None else str(entry[name]) for name in columns] for entry in entries]
+    widths = [max(len(row[index]) for row in rows) for index in range(len(columns))]
+    return '\n'.join('  '.join(value.ljust(width) for value, width in zip(row, widths)).rstrip() for row in rows)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='List Interstellar Pilot saves from their headers')
+    parser.add_argument('paths', nargs='+', help='save files, directories or glob patterns')
+    parser.add_argument('--where', action='append', default=[], metavar='CONDITION',
+                        help='only list saves matching a condition such as player_name=Phantom or credits>=1000, can be repeated')
+    parser.add_argument('--sort', default='timestamp', help='header field to sort by')
+    parser.add_argument('--reverse', action='store_true', help='sort in descending order')
+    parser.add_argument('--catalog', help='JSON file the headers are kept in, only changed saves are read again')
+    parser.add_argument('--workers', type=int, default=None, help='threads reading headers')
+    parser.add_argument('--json', action='store_true', help='print the entries as JSON')
+    args = parser.parse_args(argv)
+
+    try:
+        conditions = [parseCondition(condition) for condition in args.where]
+    except ValueError as e:
+        parser.error(str(e))
+    save_files = findSaves(args.paths)
+    if not save_files:
+        parser.error('no save files found')
+
+    start = time.perf_counter()
+    catalog = SaveCatalog(args.catalog, args.workers)
+    entries = sortEntries(filterEntries(catalog.scan(save_files), conditions), args.sort, args.reverse)
+    if args.json:
+        json.dump(entries, sys.stdout, indent=2)
+        print()
+    else:
+        print(formatEntries(entries))
+        print(f'{len(entries)} of {len(save_files)} saves, {catalog.read} read, {catalog.failed} failed in {time.perf_counter() - start:.2f} s', file=sys.stderr)
+    return 1 if catalog.failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import re
+import struct
+from array import array
+from schema import FIXED_TYPES, PARAM, Layout, _conditionFields
+from tools import SaveReader, UNIT, CAPACITOR_CHARGE, ENGINE_TROTTLE, ACTIVE_UNIT, UNIT_HEALTH
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+ARRAY_TYPECODES = {'i': 'i', 'f': 'f', '?': 'B', 'Q': 'Q'}
+NUMPY_DTYPES = {'i': '<i4', 'f': '<f4', '?': '?', 'Q': '<u8'}
+
+
+def useNumpy(use_numpy) -> bool:
+    # None uses NumPy when it is installed
+    if use_numpy is None:
+        return numpy is not None
+    if use_numpy and numpy is None:
+        raise Exception('NumPy is not installed')
+    return use_numpy
+
+
+def layoutColumns(fields) -> list:
+    # (column name, struct code) of fixed width layout fields in the order they are stored.
+    # Vectors are split into _x/_y/_z(/_w) columns, nested layouts are flattened into
+    # their own fields and PARAM fields are left out as they are not stored.
+    columns = []
+    for field in fields:
+        if not isinstance(field, tuple):
+            raise Exception('Conditional fields cannot be read as columns')
+        name, field_type = field
+        if field_type == PARAM:
+            continue
+        if isinstance(field_type, Layout):
+            columns += layoutColumns(field_type.fields)
+            continue
+        if field_type not in FIXED_TYPES:
+            raise Exception(f'Field {name} is not fixed width')
+        name = re.sub('([A-Z])', r'_\1', name).lower()
+        code = FIXED_TYPES[field_type]
+        if len(code) > 1:
+            columns += [(f'{name}_{axis}', code[-1]) for axis in 'xyzw'[:int(code[:-1])]]
+        else:
+            columns.append((name, code))
+    return columns
+
+
+def columnsStruct(columns) -> struct.Struct:
+    return struct.Struct('<' + ''.join(code for _, code in columns))
+
+
+def columnsDtype(columns):
+    # Packed like the save, without alignment padding
+    return numpy.dtype([(name, NUMPY_DTYPES[code]) for name, code in columns])
+
+
+# The unit fields before its first If are columns read with one struct call. The
+# layout's skip moves past the rest and returns the flags its conditions test, and
+# those stored after the head are columns too.
+_UNIT_HEAD = next(index for index, field in enumerate(UNIT.fields) if not isinstance(field, tuple))
+_UNIT_HEAD_COLUMNS = layoutColumns(UNIT.fields[:_UNIT_HEAD])
+_UNIT_TAIL_COLUMNS = layoutColumns([
+    field for field in UNIT.fields[_UNIT_HEAD:]
+    if isinstance(field, tuple) and field[0] in _conditionFields(UNIT.fields)
+])
+_UNIT_LAYOUT = columnsStruct(_UNIT_HEAD_COLUMNS)
+
+UNIT_COLUMNS = _UNIT_HEAD_COLUMNS + _UNIT_TAIL_COLUMNS
+CAPACITOR_CHARGE_COLUMNS = layoutColumns(CAPACITOR_CHARGE.fields)
+ENGINE_TROTTLE_COLUMNS = layoutColumns(ENGINE_TROTTLE.fields)
+ACTIVE_UNIT_COLUMNS = layoutColumns(ACTIVE_UNIT.fields)
+UNIT_HEALTH_COLUMNS = layoutColumns(UNIT_HEALTH.fields)
+
+
+# Decodes the unit table and the fixed size unit side tables into columns.
+# Tables are NumPy structured arrays when NumPy is installed, otherwise a dict
+# of array.array columns. Both are indexed by column name, e.g. table['sector'].
+class ColumnarSaveReader(SaveReader):
+    def __init__(self, data, use_numpy=None):
+        super().__init__(data)
+        self.use_numpy = useNumpy(use_numpy)
+
+    def _emptyColumns(self, columns) -> dict:
+        return {name: array(ARRAY_TYPECODES[code]) for name, code in columns}
+
+    def _toTable(self, columns, arrays):
+        if not self.use_numpy:
+            return arrays
+        count = len(arrays[columns[0][0]])
+        table = numpy.empty(count, dtype=columnsDtype(columns))
+        for name, _ in columns:
+            table[name] = arrays[name]
+        return table
+
+    def _readFixedColumns(self, columns):
+        layout = columnsStruct(columns)
+        count = self.readInt32()
+        start = self.position
+        self.position += count * layout.size
+
+        if self.use_numpy:
+            return numpy.frombuffer(self.data, dtype=columnsDtype(columns), count=count, offset=start).copy()
+
+        arrays = self._emptyColumns(columns)
+        if count:
+            rows = layout.iter_unpack(self.data[start:self.position])
+            for (name, _), values in zip(columns, zip(*rows)):
+                arrays[name].extend(values)
+        return arrays
+
+    def _readUnitColumns(self):
+        data = self.data
+        skip = UNIT.skip
+        unpack_head = _UNIT_LAYOUT.unpack_from
+        arrays = self._emptyColumns(UNIT_COLUMNS)
+        head_arrays = [arrays[name] for name, _ in _UNIT_HEAD_COLUMNS]
+        tail_arrays = [(arrays[name], name) for name, _ in _UNIT_TAIL_COLUMNS]
+
+        count = self.readInt32()
+        for _ in range(count):
+            start = self.position
+            tested = skip(self)
+            for column, value in zip(head_arrays, unpack_head(data, start)):
+                column.append(value)
+            for column, name in tail_arrays:
+                column.append(tested[name])
+        return self._toTable(UNIT_COLUMNS, arrays)
+
+    def readAllUnitColumns(self) -> dict:
+        # Variable length sections are kept as the usual record lists
+        tables = {}
+        tables['units'] = self._readUnitColumns()
+        tables['names'] = self._readUnitNames()
+        tables['component_data'] = self._readAllUnitComponentData()
+        tables['modded_components'] = self._readModdedComponents()
+        tables['capacitor_charges'] = self._readFixedColumns(CAPACITOR_CHARGE_COLUMNS)
+        tables['cloaked_units'] = self._readCloakedUnits()
+        tables['powered_down_components'] = self._readPoweredDownComponents()
+        tables['engine_trottles'] = self._readFixedColumns(ENGINE_TROTTLE_COLUMNS)
+        tables['component_cargo'] = self._readUnitComponentCargo()
+        tables['shields'] = self._readUnitShields()
+        tables['component_health'] = self._readUnitComponentHealth()
+        tables['active_units'] = self._readFixedColumns(ACTIVE_UNIT_COLUMNS)
+        tables['health'] = self._readFixedColumns(UNIT_HEALTH_COLUMNS)
+        return tables
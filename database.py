@@ -0,0 +1,309 @@
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from gameids import GAME_IDS
+from main import findSaves
+from tools import SaveReader
+
+
+# Every table has a save_id column referencing saves.id first, followed by these columns.
+# The fields read with readDouble (spawn_time, hostility_end_time, cargo_expiry_time,
+# projectile_fire_time and seconds_eslapsed) are unsigned 64 bit values, they are
+# stored as the signed 64 bit integer with the same bits as SQLite has no larger type.
+TABLES = {
+    'sectors': [
+        'id INTEGER', 'name TEXT', 'map_position_x REAL', 'map_position_y REAL', 'map_position_z REAL',
+        'resource_name TEXT', 'description TEXT', 'gate_distance_multiplier REAL', 'random_seed INTEGER',
+        'position_x REAL', 'position_y REAL', 'position_z REAL',
+        'background_rotation_x REAL', 'background_rotation_y REAL', 'background_rotation_z REAL',
+        'light_rotation_x REAL', 'light_rotation_y REAL', 'light_rotation_z REAL',
+    ],
+    'factions': [
+        'id INTEGER', 'has_generated_name INTEGER', 'generated_name_id INTEGER', 'generated_suffix_id INTEGER',
+        'has_custom_name INTEGER', 'custom_name TEXT', 'custom_short_name TEXT', 'credits INTEGER',
+        'description TEXT', 'civilian INTEGER', 'type INTEGER', 'aggression REAL', 'virtue REAL', 'greed REAL',
+        'trade_efficiency REAL', 'dynamic_relations INTEGER', 'show_job_boards INTEGER', 'create_jobs INTEGER',
+        'requisition_point_multiplier REAL', 'destory_when_no_units INTEGER', 'min_npc_combat_efficiency REAL',
+        'max_npc_combat_efficiency REAL', 'additional_rp_provision INTEGER', 'trade_illegal_goods INTEGER',
+        'spawn_time INTEGER', 'highest_networth INTEGER', 'has_ai_settings INTEGER', 'has_stats INTEGER',
+        'total_ships_claimed INTEGER', 'scratchcards_scratched INTEGER', 'highest_scratchcard_win INTEGER',
+    ],
+    'faction_ai_settings': [
+        'faction INTEGER', 'prefer_single_ship INTEGER', 'repair_ships INTEGER', 'upgrade_ships INTEGER',
+        'repair_min_hull_damage REAL', 'repair_min_credits INTEGER', 'preference_to_place_bounty REAL',
+        'large_ship_preference REAL', 'daily_income INTEGER', 'hostile_with_all INTEGER',
+        'min_fleet_unit_count INTEGER', 'max_fleet_unit_count INTEGER', 'offensinve_stance REAL',
+        'allow_other_factions_to_dock INTEGER', 'preference_to_build_turrents REAL',
+        'preference_to_build_stations REAL', 'ignore_stations_credit_reserve INTEGER',
+    ],
+    # kind is 'destoryed' or 'lost'
+    'faction_unit_stats': ['faction INTEGER', 'kind TEXT', 'class INTEGER', 'count INTEGER'],
+    'faction_excluded_sectors': ['faction INTEGER', 'sector INTEGER'],
+    'patrol_paths': ['id INTEGER', 'sector INTEGER', 'loop INTEGER'],
+    'patrol_path_nodes': ['path INTEGER', 'position_x REAL', 'position_y REAL', 'position_z REAL', '"order" INTEGER'],
+    'faction_relations': [
+        'faction INTEGER', 'other_faction INTEGER', 'permanent_peace INTEGER', 'restrict_hostility_timeout INTEGER',
+        'neutrality INTEGER', 'hostility_end_time INTEGER', 'recent_damage_recieved REAL',
+    ],
+    'faction_opinions': ['faction INTEGER', 'other_faction INTEGER', 'opinion REAL'],
+    'units': [
+        'id INTEGER', 'class INTEGER', 'class_name TEXT', 'sector INTEGER', 'position_x REAL', 'position_y REAL', 'position_z REAL',
+        'rotation_x REAL', 'rotation_y REAL', 'rotation_z REAL', 'rotation_w REAL', 'faction INTEGER',
+        'rp_provision INTEGER', 'is_cargo INTEGER', 'cargo_class INTEGER', 'cargo_class_name TEXT', 'cargo_quantity INTEGER',
+        'cargo_expires INTEGER', 'cargo_expiry_time INTEGER', 'is_debris INTEGER', 'is_ship_trader INTEGER',
+        'projectile_source_unit INTEGER', 'projectile_target_unit INTEGER', 'projectile_fire_time INTEGER',
+        'projectile_remaining_movement REAL', 'projectile_damage REAL', 'projectile_mining_damage REAL',
+        'projectile_sheild_damage_type INTEGER',
+    ],
+    'unit_ship_trader': ['unit_id INTEGER', 'sell_multiplier REAL', 'class INTEGER', 'class_name TEXT'],
+    'unit_names': ['unit_id INTEGER', 'name TEXT'],
+    'unit_component_data': [
+        'unit_id INTEGER', 'ship_name_index INTEGER', 'custom_ship_name TEXT', 'cargo_capacity REAL',
+        'has_factory INTEGER', 'under_construction INTEGER', 'construction_progress REAL',
+        'station_class_number INTEGER',
+    ],
+    'unit_factories': ['unit_id INTEGER', 'state INTEGER', 'progress REAL'],
+    'unit_modded_components': ['unit_id INTEGER', 'bay_id INTEGER', 'component INTEGER'],
+    'unit_capacitor_charges': ['unit_id INTEGER', 'capacitor_charge REAL'],
+    'unit_cloaked': ['unit_id INTEGER'],
+    'unit_powered_down_components': ['unit_id INTEGER', 'bay_id INTEGER'],
+    'unit_engine_trottles': ['unit_id INTEGER', 'trottle REAL'],
+    'unit_component_cargo': ['unit_id INTEGER', 'class INTEGER', 'class_name TEXT', 'quantity INTEGER'],
+    'unit_shields': ['unit_id INTEGER', '"index" INTEGER', 'health REAL'],
+    'unit_component_health': ['unit_id INTEGER', 'bay_id INTEGER', 'health REAL'],
+    'unit_active': ['unit_id INTEGER', 'velocity_x REAL', 'velocity_y REAL', 'velocity_z REAL', 'current_turn REAL'],
+    'unit_health': ['unit_id INTEGER', 'destoryed INTEGER', 'total_damage_recieved REAL', 'health REAL'],
+}
+
+SAVE_COLUMNS = [
+    'save_file TEXT UNIQUE', 'size INTEGER', 'mtime_ns INTEGER', 'version TEXT', 'autosave INTEGER',
+    'timestamp TEXT', 'scenario_info_id INTEGER', 'global_save_number INTEGER', 'save_number INTEGER',
+    'has_player INTEGER', 'player_sector_name TEXT', 'player_name TEXT', 'credits INTEGER',
+    'seconds_eslapsed INTEGER',
+]
+
+# (table, columns) after save_id
+INDEXES = [
+    ('sectors', 'id'),
+    ('factions', 'id'),
+    ('faction_relations', 'faction, other_faction'),
+    ('faction_opinions', 'faction, other_faction'),
+    ('units', 'id'),
+    ('units', 'sector'),
+    ('units', 'faction'),
+] + [(table, 'unit_id') for table in TABLES if table.startswith('unit_')]
+
+
+def createTables(connection):
+    columns = ', '.join(['id INTEGER PRIMARY KEY'] + SAVE_COLUMNS)
+    connection.execute(f'CREATE TABLE IF NOT EXISTS saves ({columns})')
+    for table, table_columns in TABLES.items():
+        columns = ', '.join(['save_id INTEGER REFERENCES saves(id)'] + table_columns)
+        connection.execute(f'CREATE TABLE IF NOT EXISTS {table} ({columns})')
+    for table, index_columns in INDEXES:
+        name = f"{table}_{index_columns.replace(', ', '_')}"
+        connection.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} (save_id, {index_columns})')
+
+
+def _signed(value):
+    # uint64 to the int64 with the same bits, None stays None
+    if value is not None and value >= 1 << 63:
+        return value - (1 << 64)
+    return value
+
+
+def _tableRows(save, class_names=False) -> dict:
+    # Rows of every table for one save read with readSave(raw=True), without save_id.
+    # The class_name columns are only filled in with class_names.
+    rows = {table: [] for table in TABLES}
+    unit_names = GAME_IDS.unit_names if class_names else {}
+    cargo_names = GAME_IDS.cargo_names if class_names else {}
+
+    for sector in save['sectors']:
+        rows['sectors'].append((
+            sector['id'], sector['name'], *sector['map_position'], sector['resource_name'], sector['description'],
+            sector['gate_distance_multiplier'], sector['random_seed'], *sector['position'],
+            *sector['background_rotation'], *sector['light_rotation'],
+        ))
+
+    for faction in save['factions']:
+        faction_id = faction['id']
+        stats = faction.get('stats', {})
+        rows['factions'].append((
+            faction_id, faction['has_generated_name'], faction.get('generated_name_id'),
+            faction.get('generated_suffix_id'), faction.get('has_custom_name'), faction.get('custom_name'),
+            faction.get('custom_short_name'), faction['credits'], faction['description'], faction['civilian'],
+            faction['type'], faction['aggression'], faction['virtue'], faction['greed'],
+            faction['trade_efficiency'], faction['dynamic_relations'], faction['show_job_boards'],
+            faction['create_jobs'], faction['requisition_point_multiplier'], faction['destory_when_no_units'],
+            faction['min_npc_combat_efficiency'], faction['max_npc_combat_efficiency'],
+            faction['additional_rp_provision'], faction['trade_illegal_goods'], _signed(faction['spawn_time']),
+            faction['highest_networth'], faction['has_ai_settings'], faction['has_stats'],
+            stats.get('total_ships_claimed'), stats.get('scratchcards_scratched'), stats.get('highest_scratchcard_win'),
+        ))
+        if faction['has_ai_settings']:
+            settings = faction['ai_settings']
+            rows['faction_ai_settings'].append((
+                faction_id, settings['prefer_single_ship'], settings['repair_ships'], settings['upgrade_ships'],
+                settings['repair_min_hull_damage'], settings['repair_min_credits'],
+                settings['preference_to_place_bounty'], settings['large_ship_preference'], settings['daily_income'],
+                settings['hostile_with_all'], settings['min_fleet_unit_count'], settings['max_fleet_unit_count'],
+                settings['offensinve_stance'], settings['allow_other_factions_to_dock'],
+                settings['preference_to_build_turrents'], settings['preference_to_build_stations'],
+                settings['ignore_stations_credit_reserve'],
+            ))
+        if faction['has_stats']:
+            for unit_class, count in stats['units_destoryed_by_id']:
+                rows['faction_unit_stats'].append((faction_id, 'destoryed', unit_class, count))
+            for unit_class, count in stats['units_lost_by_id']:
+                rows['faction_unit_stats'].append((faction_id, 'lost', unit_class, count))
+        for sector_id in faction['excluded_sectors']:
+            rows['faction_excluded_sectors'].append((faction_id, sector_id))
+
+    for path in save['patrol_paths']:
+        rows['patrol_paths'].append((path['id'], path['sector'], path['loop']))
+        for node in path['nodes']:
+            rows['patrol_path_nodes'].append((path['id'], *node['position'], node['order']))
+
+    for block in save['faction_relations']:
+        for relation in block['relations']:
+            rows['faction_relations'].append((
+                relation['faction'], relation['other_faction'], relation['permanent_peace'],
+                relation['restrict_hostility_timeout'], relation['neutrality'], _signed(relation['hostility_end_time']),
+                relation['recent_damage_recieved'],
+            ))
+
+    for opinion in save['faction_opinions']:
+        rows['faction_opinions'].append((opinion['faction'], opinion['other_faction'], opinion['opinion']))
+
+    sections = save['units']
+    for unit in sections['units']:
+        cargo = unit.get('cargo_data', {})
+        projectile = unit.get('projectile_data', {})
+        damage = projectile.get('damage_type', {})
+        rows['units'].append((
+            unit['id'], unit['class'], unit_names.get(unit['class']), unit['sector'], *unit['position'],
+            *unit['rotation'], unit['faction'], unit['rp_provision'], unit['is_cargo'], cargo.get('class'),
+            cargo_names.get(cargo.get('class')), cargo.get('quantity'), cargo.get('expires'),
+            _signed(cargo.get('expiry_time')), unit['is_debris'], unit['is_ship_trader'], projectile.get('source_unit'),
+            projectile.get('target_unit'), _signed(projectile.get('fire_time')), projectile.get('remaining_movement'),
+            damage.get('damage'), damage.get('mining_damage'), damage.get('sheild_damage_type'),
+        ))
+        for ship in unit.get('ship_trader_data', []):
+            rows['unit_ship_trader'].append((unit['id'], ship['sell_multiplier'], ship['class'], unit_names.get(ship['class'])))
+
+    for name in sections['names']:
+        rows['unit_names'].append((name['unit_id'], name['name']))
+    for component_data in sections['component_data']:
+        unit_id = component_data['unit_id']
+        rows['unit_component_data'].append((
+            unit_id, component_data['ship_name_index'], component_data.get('custom_ship_name'),
+            component_data['cargo_capacity'], component_data['has_factory'], component_data['under_construction'],
+            component_data['construction_progress'], component_data['station_class_number'],
+        ))
+        for factory in component_data.get('factories', []):
+            rows['unit_factories'].append((unit_id, factory['state'], factory['progress']))
+    for component in sections['modded_components']:
+        rows['unit_modded_components'].append((component['unit_id'], component['bay_id'], component['component']))
+    for charge in sections['capacitor_charges']:
+        rows['unit_capacitor_charges'].append((charge['unit_id'], charge['capacitor_charge']))
+    for unit_id in sections['cloaked_units']:
+        rows['unit_cloaked'].append((unit_id,))
+    for component in sections['powered_down_components']:
+        rows['unit_powered_down_components'].append((component['unit_id'], component['bay_id']))
+    for trottle in sections['engine_trottles']:
+        rows['unit_engine_trottles'].append((trottle['unit_id'], trottle['trottle']))
+    for block in sections['component_cargo']:
+        for cargo in block['cargo']:
+            rows['unit_component_cargo'].append((block['unit_id'], cargo['class'], cargo_names.get(cargo['class']), cargo['quantity']))
+    for shield in sections['shields']:
+        for sheild_point in shield['data']:
+            rows['unit_shields'].append((shield['unit_id'], sheild_point['index'], sheild_point['health']))
+    for health in sections['component_health']:
+        for compontent in health['component_health']:
+            rows['unit_component_health'].append((health['unit_id'], compontent['bay_id'], compontent['health']))
+    for active_unit in sections['active_units']:
+        active_data = active_unit['active_data']
+        rows['unit_active'].append((active_unit['unit_id'], *active_data['velocity'], active_data['currentTurn']))
+    for health in sections['health']:
+        rows['unit_health'].append((health['unit_id'], health['destoryed'], health['total_damage_recieved'], health['health']))
+    return rows
+
+
+def exportSave(connection, save_file, force=False, class_names=False) -> bool:
+    # Replaces the rows of save_file in one transaction. Returns False when the
+    # save is already exported with the same size and modification time.
+    path = os.path.abspath(save_file)
+    stat = os.stat(path)
+    exported = connection.execute('SELECT id, size, mtime_ns FROM saves WHERE save_file = ?', (path,)).fetchone()
+    if exported is not None and not force and exported[1:] == (stat.st_size, stat.st_mtime_ns):
+        return False
+
+    with SaveReader.fromPath(path) as reader:
+        save = reader.readSave(raw=True)
+    header = save['header']
+
+    with connection:
+        if exported is not None:
+            for table in TABLES:
+                connection.execute(f'DELETE FROM {table} WHERE save_id = ?', (exported[0],))
+            connection.execute('DELETE FROM saves WHERE id = ?', (exported[0],))
+        cursor = connection.execute(
+            f"INSERT INTO saves VALUES (NULL{', ?' * len(SAVE_COLUMNS)})",
+            (
+                path, stat.st_size, stat.st_mtime_ns, header['version'], header['autosave'], header['timestamp'],
+                header['scenario_info_id'], header['global_save_number'], header['save_number'],
+                header['has_player'], header.get('player_sector_name'), header.get('player_name'),
+                header.get('credits'), _signed(save['seconds_eslapsed']),
+            ),
+        )
+        save_id = cursor.lastrowid
+        for table, rows in _tableRows(save, class_names).items():
+            if rows:
+                placeholders = ', '.join('?' * (len(TABLES[table]) + 1))
+                connection.executemany(f'INSERT INTO {table} VALUES ({placeholders})', [(save_id, *row) for row in rows])
+    return True
+
+
+def exportSaves(database, save_files, force=False, class_names=False) -> list:
+    # (save_file, exported) for each save, errors are printed and the other saves still exported
+    results = []
+    connection = sqlite3.connect(database)
+    try:
+        createTables(connection)
+        for save_file in save_files:
+            try:
+                results.append((save_file, exportSave(connection, save_file, force, class_names)))
+            except Exception as e:
+                print(f'FAILED {save_file}: {type(e).__name__}: {e}', file=sys.stderr)
+                results.append((save_file, None))
+    finally:
+        connection.close()
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Export Interstellar Pilot saves to a SQLite database')
+    parser.add_argument('paths', nargs='+', help='save files, directories or glob patterns')
+    parser.add_argument('-o', '--database', default='saves.db', help='SQLite database the saves are added to')
+    parser.add_argument('--force', action='store_true', help='export saves again even when they are unchanged')
+    parser.add_argument('--class-names', action='store_true', help='fill in the GameIDs name of every unit and cargo class')
+    args = parser.parse_args(argv)
+
+    save_files = findSaves(args.paths)
+    if not save_files:
+        parser.error('no save files found')
+
+    start = time.perf_counter()
+    results = exportSaves(args.database, save_files, args.force, args.class_names)
+    exported = sum(1 for _, result in results if result)
+    skipped = sum(1 for _, result in results if result is False)
+    failed = sum(1 for _, result in results if result is None)
+    print(f'{exported} exported, {skipped} unchanged, {failed} failed in {time.perf_counter() - start:.2f} s')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,165 @@
+import argparse
+import json
+import sys
+from sections import LazySaveReader
+from tools import SAVE_SECTIONS, UNIT_SECTIONS
+
+
+# Field or fields identifying a record in each list section
+SECTION_KEYS = {
+    'sectors': ('id',),
+    'factions': ('id',),
+    'patrol_paths': ('id',),
+    'faction_relations': ('faction', 'other_faction'),
+    'faction_opinions': ('faction', 'other_faction'),
+    'units': ('id',),
+}
+
+
+def sectionRanges(reader) -> dict:
+    # (start, end) byte range of every top level section
+    offsets = reader.offsets if reader.offsets is not None else reader.skim()
+    names = [name for name, _ in SAVE_SECTIONS] + ['end']
+    return {name: (offsets[name], offsets[names[index + 1]]) for index, name in enumerate(names[:-1])}
+
+
+def unitSectionRanges(reader) -> dict:
+    # (start, end) byte range of every table of the unit section, in UNIT_SECTIONS
+    if reader.offsets is None or 'unit_sections' not in reader.offsets:
+        reader.skim()
+    offsets = reader.offsets['unit_sections']
+    names = [name for name, _ in UNIT_SECTIONS] + ['end']
+    return {name: (offsets[name], offsets[names[index + 1]]) for index, name in enumerate(names[:-1])}
+
+
+def diffValues(old, new, path='', changes=None) -> dict:
+    # Changed leaves as {dotted path: (old, new)}, nested dicts are compared field by
+    # field while lists and tuples are compared as a whole
+    if changes is None:
+        changes = {}
+    if isinstance(old, dict) and isinstance(new, dict):
+        for field in dict.fromkeys([*old, *new]):
+            old_value = old.get(field)
+            new_value = new.get(field)
+            if old_value != new_value:
+                diffValues(old_value, new_value, f'{path}.{field}' if path else field, changes)
+    elif old != new:
+        changes[path] = (old, new)
+    return changes
+
+
+def _recordKey(fields):
+    if len(fields) == 1:
+        field = fields[0]
+        return lambda record: record[field]
+    return lambda record: tuple(record[field] for field in fields)
+
+
+def diffRecords(old_records, new_records, key_fields) -> dict:
+    key = _recordKey(key_fields)
+    old_by_key = {key(record): record for record in old_records}
+    new_by_key = {key(record): record for record in new_records}
+
+    changed = {}
+    for record_key, new_record in new_by_key.items():
+        old_record = old_by_key.get(record_key)
+        if old_record is not None and old_record != new_record:
+            changed[record_key] = diffValues(old_record, new_record)
+    return {
+        'added': [record_key for record_key in new_by_key if record_key not in old_by_key],
+        'removed': [record_key for record_key in old_by_key if record_key not in new_by_key],
+        'changed': changed,
+    }
+
+
+def diffSection(name, old_section, new_section):
+    # Change set of one decoded section, None when the records are the same
+    if name in SECTION_KEYS:
+        changes = diffRecords(old_section, new_section, SECTION_KEYS[name])
+        # The bytes can also differ when the same records are stored in a different order
+        return changes if any(changes.values()) else None
+    if isinstance(old_section, dict):
+        changes = diffValues(old_section, new_section)
+    elif old_section != new_section:
+        changes = {'': (old_section, new_section)}
+    else:
+        changes = {}
+    return {'changed': changes} if changes else None
+
+
+def diffReaders(old_reader, new_reader) -> dict:
+    # Only sections whose stored bytes differ are decoded and compared
+    old_ranges = sectionRanges(old_reader)
+    new_ranges = sectionRanges(new_reader)
+
+    changes = {}
+    for name, _ in SAVE_SECTIONS:
+        old_start, old_end = old_ranges[name]
+        new_start, new_end = new_ranges[name]
+        if old_reader.data[old_start:old_end] == new_reader.data[new_start:new_end]:
+            continue
+
+        section_changes = diffSection(name, old_reader.readSection(name), new_reader.readSection(name))
+        if section_changes is not None:
+            changes[name] = section_changes
+    return changes
+
+
+def diffSaves(old_path, new_path) -> dict:
+    with LazySaveReader.fromPath(old_path) as old_reader, LazySaveReader.fromPath(new_path) as new_reader:
+        return diffReaders(old_reader, new_reader)
+
+
+def _formatKey(key) -> str:
+    return ','.join(map(str, key)) if isinstance(key, tuple) else str(key)
+
+
+def formatChanges(changes) -> str:
+    lines = []
+    for name, section in changes.items():
+        if name not in SECTION_KEYS:
+            for path, (old, new) in section['changed'].items():
+                lines.append(f"{name}{'.' + path if path else ''}: {old!r} -> {new!r}")
+            continue
+
+        lines.append(f"{name}: {len(section['added'])} added, {len(section['removed'])} removed, {len(section['changed'])} changed")
+        for key in section['added']:
+            lines.append(f'  + {_formatKey(key)}')
+        for key in section['removed']:
+            lines.append(f'  - {_formatKey(key)}')
+        for key, fields in section['changed'].items():
+            for path, (old, new) in fields.items():
+                lines.append(f'  ~ {_formatKey(key)} {path}: {old!r} -> {new!r}')
+    return '\n'.join(lines)
+
+
+def jsonChanges(changes) -> dict:
+    # Tuple keys are not valid JSON object keys, they are written as "faction,other_faction"
+    result = {}
+    for name, section in changes.items():
+        result[name] = {
+            'added': [_formatKey(key) for key in section.get('added', [])],
+            'removed': [_formatKey(key) for key in section.get('removed', [])],
+            'changed': {_formatKey(key): value for key, value in section['changed'].items()},
+        }
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Show what changed between two Interstellar Pilot saves')
+    parser.add_argument('old', help='older save file')
+    parser.add_argument('new', help='newer save file')
+    parser.add_argument('--json', action='store_true', help='print the change set as JSON')
+    args = parser.parse_args(argv)
+
+    changes = diffSaves(args.old, args.new)
+    if args.json:
+        print(json.dumps(jsonChanges(changes), indent=2))
+    elif changes:
+        print(formatChanges(changes))
+    # Like diff, 1 when the saves differ
+    return 1 if changes else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+import json
+from gameids import GAME_IDS
+from schema import Record
+from tools import SAVE_SECTIONS
+
+
+# Sections that can be written record by record as they are decoded
+STREAMED_SECTIONS = {
+    'sectors': 'iterSectors',
+    'factions': 'iterFactions',
+    'patrol_paths': 'iterPatrolPaths',
+    'faction_relations': 'iterFactionRelations',
+    'faction_opinions': 'iterFactionOpinions',
+    'units': 'iterAllUnitData',
+}
+
+
+def _toJson(value):
+    # Records from records.RecordSaveReader are written as the dicts SaveReader returns
+    if isinstance(value, Record):
+        return value.toDict()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def writeJson(reader, f, indent=2, class_names=False):
+    # Writes the same text as json.dump(reader.readSave(), f, indent=indent) without
+    # holding the large record lists in memory. With class_names units get the
+    # class_name fields of GameIds.addClassName.
+    if indent is None:
+        newline, item_newline = '', ''
+        separator = ', '
+    else:
+        newline = '\n' + ' ' * indent
+        item_newline = newline + ' ' * indent
+        separator = ','
+
+    f.write('{')
+    for count, (name, method) in enumerate(SAVE_SECTIONS):
+        if count:
+            f.write(separator)
+        f.write(f'{newline}{json.dumps(name)}: ')
+
+        if name not in STREAMED_SECTIONS:
+            value = getattr(reader, method)()
+            f.write(json.dumps(value, indent=indent, default=_toJson).replace('\n', newline))
+            continue
+
+        f.write('[')
+        empty = True
+        for record in getattr(reader, STREAMED_SECTIONS[name])():
+            if class_names and name == 'units':
+                GAME_IDS.addClassName(record)
+            if not empty:
+                f.write(separator)
+            f.write(item_newline)
+            f.write(json.dumps(record, indent=indent, default=_toJson).replace('\n', item_newline))
+            empty = False
+        f.write(']' if empty else newline + ']')
+    f.write('\n}' if indent is not None else '}')
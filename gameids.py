@@ -0,0 +1,96 @@
+import functools
+import json
+import os
+
+
+GAME_IDS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'GameIDs')
+
+# Category of each unit name prefix in Unit.json
+UNIT_CATEGORIES = {
+    'Projectile': 'projectile',
+    'Ship': 'ship',
+    'Station': 'station',
+    'Asteroid': 'asteroid',
+    'AsteroidCluster': 'asteroid',
+    'Cargo': 'cargo',
+    'Planet': 'planet',
+    'Moon1': 'moon',
+    'Moon2': 'moon',
+    'Moon3': 'moon',
+    'Moon4': 'moon',
+    'Wormhole': 'wormhole',
+    'WormholeUnstable': 'wormhole',
+    'Misc': 'misc',
+}
+
+
+# Unit and cargo class ids from GameIDs, with dict lookups for names and categories
+class GameIds:
+    def __init__(self, unit_ids, cargo_ids):
+        # unit_ids and cargo_ids map names to class ids, as in Unit.json and Cargo.json.
+        # Where several names share an id the first one is used.
+        self.unit_names = {}
+        self.unit_categories = {}
+        category_ids = {category: set() for category in UNIT_CATEGORIES.values()}
+        for name, class_id in unit_ids.items():
+            self.unit_names.setdefault(class_id, name)
+            category = UNIT_CATEGORIES.get(name.split('_', 1)[0])
+            if category is not None:
+                self.unit_categories.setdefault(class_id, category)
+                category_ids[category].add(class_id)
+        self.category_ids = {category: frozenset(ids) for category, ids in category_ids.items()}
+
+        self.cargo_names = {}
+        for name, class_id in cargo_ids.items():
+            self.cargo_names.setdefault(class_id, name)
+
+    @classmethod
+    def fromDirectory(cls, directory=GAME_IDS_DIR):
+        with open(os.path.join(directory, 'Unit.json')) as f:
+            unit_ids = json.load(f)
+        with open(os.path.join(directory, 'Cargo.json')) as f:
+            cargo_ids = json.load(f)
+        return cls(unit_ids, cargo_ids)
+
+    def unitName(self, class_id, default=None):
+        return self.unit_names.get(class_id, default)
+
+    def cargoName(self, class_id, default=None):
+        return self.cargo_names.get(class_id, default)
+
+    def unitCategory(self, class_id, default=None):
+        return self.unit_categories.get(class_id, default)
+
+    def isCategory(self, class_id, category) -> bool:
+        return class_id in self.category_ids[category]
+
+    def addClassName(self, unit):
+        # Adds class_name next to every class field of a unit from readAllUnitData, as a
+        # dict or a records.RecordSaveReader record: the unit, its cargo_data,
+        # ship_trader_data entries and component cargo. Unknown ids get None.
+        unit_names = self.unit_names
+        cargo_names = self.cargo_names
+        unit['class_name'] = unit_names.get(unit['class'])
+        if 'cargo_data' in unit:
+            unit['cargo_data']['class_name'] = cargo_names.get(unit['cargo_data']['class'])
+        for ship in unit.get('ship_trader_data', ()):
+            ship['class_name'] = unit_names.get(ship['class'])
+        component_data = unit.get('component_data')
+        if component_data is not None:
+            for cargo in component_data['cargo']:
+                cargo['class_name'] = cargo_names.get(cargo['class'])
+        return unit
+
+    def addClassNames(self, units):
+        for unit in units:
+            self.addClassName(unit)
+        return units
+
+
+@functools.lru_cache(maxsize=None)
+def loadGameIds(directory=GAME_IDS_DIR) -> GameIds:
+    # Read once per directory
+    return GameIds.fromDirectory(directory)
+
+
+GAME_IDS = loadGameIds()
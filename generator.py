@@ -0,0 +1,291 @@
+import argparse
+import random
+from gameids import GAME_IDS
+from tools import SaveWriter, PROJECTILE_IDS
+
+
+def _vector(rng, size, scale) -> tuple:
+    return tuple(rng.uniform(-scale, scale) for _ in range(size))
+
+
+def _generateSector(rng, sector_id) -> dict:
+    sector = {}
+    sector['id'] = sector_id
+    sector['name'] = f'Sector {sector_id}'
+    sector['map_position'] = _vector(rng, 3, 100)
+    sector['resource_name'] = f'Location{rng.randrange(100):03}'
+    sector['description'] = ''
+    sector['gate_distance_multiplier'] = rng.uniform(0.5, 1.5)
+    sector['random_seed'] = rng.randrange(1 << 20)
+    sector['position'] = _vector(rng, 3, 32000)
+    sector['background_rotation'] = _vector(rng, 3, 180)
+    sector['light_rotation'] = _vector(rng, 3, 180)
+    return sector
+
+
+def _generateFaction(rng, faction_id, sector_ids) -> dict:
+    faction = {}
+    faction['id'] = faction_id
+    faction['has_generated_name'] = rng.random() < 0.8
+    if faction['has_generated_name']:
+        faction['generated_name_id'] = rng.randrange(200)
+        faction['generated_suffix_id'] = rng.randrange(50)
+    else:
+        faction['has_custom_name'] = True
+        faction['custom_name'] = f'Faction {faction_id}'
+        faction['custom_short_name'] = f'F{faction_id}'
+
+    faction['credits'] = rng.randrange(1000000)
+    faction['description'] = ''
+    faction['civilian'] = rng.random() < 0.3
+    faction['type'] = rng.choice([0, 1, 2, 64])
+    faction['aggression'] = rng.random()
+    faction['virtue'] = rng.random()
+    faction['greed'] = rng.random()
+    faction['trade_efficiency'] = rng.random()
+    faction['dynamic_relations'] = True
+    faction['show_job_boards'] = True
+    faction['create_jobs'] = True
+    faction['requisition_point_multiplier'] = 1.0
+    faction['destory_when_no_units'] = False
+    faction['min_npc_combat_efficiency'] = 0.0
+    faction['max_npc_combat_efficiency'] = 1.0
+    faction['additional_rp_provision'] = 0
+    faction['trade_illegal_goods'] = rng.random() < 0.5
+    faction['spawn_time'] = 0
+    faction['highest_networth'] = rng.randrange(1000000)
+
+    faction['has_ai_settings'] = True
+    settings = {}
+    settings['prefer_single_ship'] = False
+    settings['repair_ships'] = True
+    settings['upgrade_ships'] = True
+    settings['repair_min_hull_damage'] = 0.2
+    settings['repair_min_credits'] = 2000
+    settings['preference_to_place_bounty'] = rng.random()
+    settings['large_ship_preference'] = rng.random()
+    settings['daily_income'] = rng.randrange(500000)
+    settings['hostile_with_all'] = False
+    settings['min_fleet_unit_count'] = 2
+    settings['max_fleet_unit_count'] = 4
+    settings['offensinve_stance'] = rng.random()
+    settings['allow_other_factions_to_dock'] = rng.random() < 0.5
+    settings['preference_to_build_turrents'] = rng.random()
+    settings['preference_to_build_stations'] = rng.random()
+    settings['ignore_stations_credit_reserve'] = False
+    faction['ai_settings'] = settings
+
+    faction['has_stats'] = rng.random() < 0.5
+    if faction['has_stats']:
+        stats = {}
+        stats['total_ships_claimed'] = rng.randrange(10)
+        stats['units_destoryed_by_id'] = [(rng.randrange(50000), rng.randrange(1, 5)) for _ in range(rng.randrange(5))]
+        stats['units_lost_by_id'] = [(rng.randrange(50000), rng.randrange(1, 5)) for _ in range(rng.randrange(5))]
+        stats['scratchcards_scratched'] = 0
+        stats['highest_scratchcard_win'] = 0
+        faction['stats'] = stats
+
+    faction['excluded_sectors'] = rng.sample(sector_ids, min(len(sector_ids), rng.randrange(3)))
+    return faction
+
+
+def _generateRelationBlocks(rng, faction_ids, relations_per_faction) -> list:
+    blocks = []
+    for faction_id in faction_ids:
+        others = [other for other in faction_ids if other != faction_id]
+        if relations_per_faction is not None:
+            others = rng.sample(others, min(len(others), relations_per_faction))
+        block = {'faction': faction_id, 'relations': []}
+        for other_faction in others:
+            relation = {}
+            relation['faction'] = faction_id
+            relation['other_faction'] = other_faction
+            relation['permanent_peace'] = False
+            relation['restrict_hostility_timeout'] = False
+            # Hostile, neutral or allied as in matrices.HOSTILE
+            relation['neutrality'] = rng.choice([-1, 0, 1])
+            relation['hostility_end_time'] = 0
+            relation['recent_damage_recieved'] = 0.0
+            block['relations'].append(relation)
+        blocks.append(block)
+    return blocks
+
+
+def _generateUnit(rng, unit_id, unit_class, sector_ids, faction_ids, cargo_ids, unit_ids) -> dict:
+    unit = {}
+    unit['id'] = unit_id
+    unit['class'] = unit_class
+    unit['sector'] = rng.choice(sector_ids)
+    unit['position'] = _vector(rng, 3, 30000)
+    unit['rotation'] = (0.0, rng.uniform(-1, 1), 0.0, 1.0)
+    unit['faction'] = rng.choice(faction_ids)
+    unit['rp_provision'] = rng.choice([0, 0, 250, 750])
+
+    unit['is_cargo'] = rng.random() < 0.02
+    if unit['is_cargo']:
+        unit['cargo_data'] = {'class': rng.choice(cargo_ids), 'quantity': rng.randrange(1, 100), 'expires': True, 'expiry_time': 0}
+
+    unit['is_debris'] = False
+    unit['is_ship_trader'] = rng.random() < 0.01
+    if unit['is_ship_trader']:
+        unit['ship_trader_data'] = [{'sell_multiplier': 1.0, 'class': rng.choice([0, 50, 100])} for _ in range(rng.randrange(1, 4))]
+
+    if unit_class in PROJECTILE_IDS:
+        projectile = {}
+        projectile['source_unit'] = rng.choice(unit_ids)
+        projectile['target_unit'] = rng.choice(unit_ids)
+        projectile['fire_time'] = 0
+        projectile['remaining_movement'] = rng.uniform(0, 1000)
+        projectile['damage_type'] = {'damage': rng.uniform(0, 100), 'mining_damage': 0.0, 'sheild_damage_type': 0}
+        unit['projectile_data'] = projectile
+    return unit
+
+
+def _generateUnitSections(rng, unit_count, sector_ids, faction_ids, cargo_count, shield_count, active_unit_count, projectile_share) -> dict:
+    unit_classes = sorted(set(GAME_IDS.unit_names) - PROJECTILE_IDS)
+    projectile_classes = sorted(PROJECTILE_IDS)
+    cargo_ids = sorted(GAME_IDS.cargo_names)
+    unit_ids = list(range(100000, 100000 + unit_count))
+
+    sections = {}
+    sections['units'] = []
+    for unit_id in unit_ids:
+        if rng.random() < projectile_share:
+            unit_class = rng.choice(projectile_classes)
+        else:
+            unit_class = rng.choice(unit_classes)
+        sections['units'].append(_generateUnit(rng, unit_id, unit_class, sector_ids, faction_ids, cargo_ids, unit_ids))
+
+    # Ships and stations are the units with component data, roughly three quarters of them
+    component_ids = sorted(rng.sample(unit_ids, unit_count * 3 // 4))
+
+    sections['names'] = [{'unit_id': unit_id, 'name': f'Unit {unit_id}'} for unit_id in component_ids[::4]]
+
+    sections['component_data'] = []
+    for unit_id in component_ids:
+        component_data = {}
+        component_data['unit_id'] = unit_id
+        component_data['ship_name_index'] = rng.choice([-1, rng.randrange(100)])
+        if component_data['ship_name_index'] == -1:
+            component_data['custom_ship_name'] = ''
+        component_data['cargo_capacity'] = rng.choice([0.0, 100.0, 300.0, 1000.0])
+        component_data['has_factory'] = rng.random() < 0.05
+        if component_data['has_factory']:
+            component_data['factories'] = [{'state': rng.randrange(3), 'progress': rng.random()} for _ in range(rng.randrange(1, 4))]
+        component_data['under_construction'] = False
+        component_data['construction_progress'] = 1.0
+        component_data['station_class_number'] = 0
+        sections['component_data'].append(component_data)
+
+    sections['modded_components'] = []
+    for unit_id in component_ids:
+        for bay_id in range(rng.randrange(3)):
+            sections['modded_components'].append({'unit_id': unit_id, 'bay_id': bay_id, 'component': rng.randrange(100)})
+
+    sections['capacitor_charges'] = [{'unit_id': unit_id, 'capacitor_charge': rng.uniform(0, 100)} for unit_id in component_ids]
+    sections['cloaked_units'] = [unit_id for unit_id in component_ids if rng.random() < 0.01]
+    sections['powered_down_components'] = [{'unit_id': unit_id, 'bay_id': 0} for unit_id in component_ids if rng.random() < 0.01]
+    sections['engine_trottles'] = [{'unit_id': unit_id, 'trottle': rng.random()} for unit_id in component_ids]
+
+    sections['component_cargo'] = []
+    for unit_id in sorted(rng.sample(component_ids, min(cargo_count, len(component_ids)))):
+        cargo = [{'class': rng.choice(cargo_ids), 'quantity': rng.randrange(1, 500)} for _ in range(rng.randrange(1, 5))]
+        sections['component_cargo'].append({'unit_id': unit_id, 'cargo': cargo})
+
+    sections['shields'] = []
+    for unit_id in sorted(rng.sample(component_ids, min(shield_count, len(component_ids)))):
+        data = [{'index': index, 'health': rng.uniform(0, 500)} for index in range(rng.randrange(1, 5))]
+        sections['shields'].append({'unit_id': unit_id, 'data': data})
+
+    sections['component_health'] = []
+    for unit_id in component_ids:
+        component_health = [{'bay_id': bay_id, 'health': rng.uniform(0, 100)} for bay_id in range(rng.randrange(4))]
+        sections['component_health'].append({'unit_id': unit_id, 'component_health': component_health})
+
+    sections['active_units'] = []
+    for unit_id in rng.sample(component_ids, min(active_unit_count, len(component_ids))):
+        active_data = {'velocity': _vector(rng, 3, 50), 'currentTurn': rng.uniform(-1, 1)}
+        sections['active_units'].append({'unit_id': unit_id, 'active_data': active_data})
+
+    sections['health'] = []
+    for unit_id in unit_ids:
+        health = rng.uniform(100, 2000)
+        sections['health'].append({'unit_id': unit_id, 'destoryed': False, 'total_damage_recieved': 0.0, 'health': health})
+    return sections
+
+
+def generateSave(seed=0, sectors=16, factions=40, units=1000, cargo=200, shields=300, active_units=100,
+                 relations_per_faction=None, opinions=None, projectile_share=0.01) -> dict:
+    # Returns a save in the raw layout of SaveReader.readSave(raw=True)
+    if units > 0 and (sectors < 1 or factions < 1):
+        raise Exception(f'Units need at least one sector and one faction, got {sectors} sectors and {factions} factions')
+    rng = random.Random(seed)
+    sector_ids = list(range(100000, 100000 + sectors))
+    faction_ids = list(range(100200, 100200 + factions))
+
+    save = {}
+    save['header'] = {
+        'version': '1.6.2',
+        'autosave': True,
+        'timestamp': '2022-05-14 07-29-31',
+        'scenario_info_id': rng.randrange(10000),
+        'global_save_number': 1,
+        'save_number': 1,
+        'has_player': True,
+        'player_sector_name': f'Sector {sector_ids[0]}' if sector_ids else '',
+        'player_name': 'Generated',
+        'credits': rng.randrange(1000000),
+    }
+    save['seconds_eslapsed'] = rng.randrange(1 << 62)
+    save['sectors'] = [_generateSector(rng, sector_id) for sector_id in sector_ids]
+    save['factions'] = [_generateFaction(rng, faction_id, sector_ids) for faction_id in faction_ids]
+    save['patrol_paths'] = []
+    save['faction_relations'] = _generateRelationBlocks(rng, faction_ids, relations_per_faction)
+
+    if opinions is None:
+        opinions = factions * 10
+    save['faction_opinions'] = []
+    if factions > 1:
+        for _ in range(opinions):
+            faction, other_faction = rng.sample(faction_ids, 2)
+            save['faction_opinions'].append({'faction': faction, 'other_faction': other_faction, 'opinion': rng.uniform(-1, 1)})
+
+    save['units'] = _generateUnitSections(rng, units, sector_ids, faction_ids, cargo, shields, active_units, projectile_share)
+    return save
+
+
+def writeGeneratedSave(path, **options):
+    # The part of a save after the unit block is not decoded yet, so it is left empty
+    data = SaveWriter().writeSave(generateSave(**options), raw=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic save for scale testing')
+    parser.add_argument('output', help='path of the .dat file to write')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sectors', type=int, default=16)
+    parser.add_argument('--factions', type=int, default=40)
+    parser.add_argument('--units', type=int, default=1000)
+    parser.add_argument('--cargo', type=int, default=200, help='units carrying component cargo')
+    parser.add_argument('--shields', type=int, default=300, help='units with shield data')
+    parser.add_argument('--active-units', type=int, default=100)
+    parser.add_argument('--relations-per-faction', type=int, default=None, help='default: every other faction')
+    parser.add_argument('--opinions', type=int, default=None, help='default: ten per faction')
+    args = parser.parse_args()
+
+    size = writeGeneratedSave(
+        args.output,
+        seed=args.seed,
+        sectors=args.sectors,
+        factions=args.factions,
+        units=args.units,
+        cargo=args.cargo,
+        shields=args.shields,
+        active_units=args.active_units,
+        relations_per_faction=args.relations_per_faction,
+        opinions=args.opinions,
+    )
+    print(f'Wrote {args.output} ({size} bytes)')
@@ -0,0 +1,113 @@
+import contextlib
+import inspect
+import time
+from collections import Counter
+from tools import SAVE_SECTIONS
+
+
+# Reader methods that decode a single field, counted by calls and bytes consumed
+PRIMITIVES = [
+    'readStruct', 'readVector3', 'readVector4', 'readSingle', 'readInt32',
+    'readDouble', 'readBoolean', 'read7BitInt', 'readString', 'readByte',
+]
+
+
+class ReaderStats:
+    def __init__(self):
+        self.calls = Counter()
+        self.bytes = Counter()
+        self.seconds = Counter()
+
+    def sectionSeconds(self) -> dict:
+        return {name: self.seconds[method] for name, method in SAVE_SECTIONS if method in self.seconds}
+
+    def format(self) -> str:
+        # Method times include the methods they call
+        lines = [f"{'primitive':<32} {'calls':>10} {'bytes':>12}"]
+        for name in sorted(self.bytes, key=self.bytes.get, reverse=True):
+            lines.append(f'{name:<32} {self.calls[name]:>10} {self.bytes[name]:>12}')
+        lines.append('')
+        lines.append(f"{'method':<32} {'calls':>10} {'ms':>12}")
+        for name, seconds in self.seconds.most_common():
+            lines.append(f'{name:<32} {self.calls[name]:>10} {seconds * 1000:>12.3f}')
+        return '\n'.join(lines)
+
+
+def _countPrimitive(name, method):
+    def wrapper(self, *args, **kwargs):
+        start = self.position
+        value = method(self, *args, **kwargs)
+        stats = self._stats
+        stats.calls[name] += 1
+        stats.bytes[name] += self.position - start
+        return value
+    return wrapper
+
+
+def _timeMethod(name, method):
+    def wrapper(self, *args, **kwargs):
+        stats = self._stats
+        stats.calls[name] += 1
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            stats.seconds[name] += time.perf_counter() - start
+    return wrapper
+
+
+def _timeGenerator(name, method):
+    # Only the time spent producing each record is counted, not the consumer's
+    def wrapper(self, *args, **kwargs):
+        stats = self._stats
+        stats.calls[name] += 1
+        generator = method(self, *args, **kwargs)
+        while True:
+            start = time.perf_counter()
+            try:
+                value = next(generator)
+            except StopIteration:
+                stats.seconds[name] += time.perf_counter() - start
+                return
+            stats.seconds[name] += time.perf_counter() - start
+            yield value
+    return wrapper
+
+
+_instrumented_classes = {}
+
+
+def instrumentedClass(reader_class):
+    # Subclass of reader_class with every primitive counted and every read/iter/skim method timed
+    if reader_class in _instrumented_classes:
+        return _instrumented_classes[reader_class]
+
+    methods = {}
+    for name, method in inspect.getmembers(reader_class, inspect.isfunction):
+        if name in PRIMITIVES:
+            methods[name] = _countPrimitive(name, method)
+        elif name.startswith('iter'):
+            methods[name] = _timeGenerator(name, method)
+        elif name.startswith(('read', '_read', 'skim', '_skim')):
+            methods[name] = _timeMethod(name, method)
+
+    instrumented = type('Instrumented' + reader_class.__name__, (reader_class,), methods)
+    _instrumented_classes[reader_class] = instrumented
+    return instrumented
+
+
+@contextlib.contextmanager
+def instrument(reader, stats=None):
+    # Swaps the reader's class for the instrumented one for the duration of the block, e.g.
+    #   with instrument(reader) as stats:
+    #       reader.readSave()
+    #   print(stats.format())
+    stats = ReaderStats() if stats is None else stats
+    original_class = reader.__class__
+    reader._stats = stats
+    reader.__class__ = instrumentedClass(original_class)
+    try:
+        yield stats
+    finally:
+        reader.__class__ = original_class
+        del reader._stats
@@ -1,29 +1,112 @@
-import json
-import copy
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from tools import SaveReader
+from export import writeJson
 
-save_file = [
-    'saves/051_Pixelfactor_002.dat',
-    'saves/AutoSave0.dat',
-    'saves/Player_Shuttle.dat',
-    'saves/055_Player_001.dat',
-    'saves/056_Phantom_014.dat'
-][4]
-
-with open(save_file, 'rb') as f:
-    reader = SaveReader(f.read())
-
-save = {}
-save['header'] = reader.readHeader()
-save['seconds_eslapsed'] = reader.readDouble()
-save['sectors'] = reader.readSectors()
-save['factions'] = reader.readFactions()
-save['patrol_paths'] = reader.readPatrolPaths()
-save['faction_relations'] = reader.readFactionRelations()
-save['faction_opinions'] = reader.readFactionOpinions()
-save['units'] = reader.readAllUnitData()
-
-#print(save['units'])
-
-with open('data.json', 'w') as f:
-    json.dump(save, f, indent=2)
+
+def findSaves(paths) -> list:
+    save_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            save_files.extend(sorted(glob.glob(os.path.join(path, '*.dat'))))
+        elif glob.has_magic(path):
+            save_files.extend(sorted(glob.glob(path)))
+        else:
+            save_files.append(path)
+    # The same save can be matched by more than one argument
+    return list(dict.fromkeys(save_files))
+
+
+def convertSave(save_file, output_file, indent, class_names=False) -> dict:
+    # Runs in a worker process, errors are returned so one bad save does not stop the batch
+    result = {'save_file': save_file, 'output_file': output_file, 'size': 0, 'error': None}
+    start = time.perf_counter()
+    try:
+        result['size'] = os.path.getsize(save_file)
+        with SaveReader.fromPath(save_file) as reader, open(output_file, 'w') as f:
+            writeJson(reader, f, indent=indent, class_names=class_names)
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+        if os.path.exists(output_file):
+            os.remove(output_file)
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def outputPaths(save_files, output_dir) -> dict:
+    # The JSON file of each save, at its path relative to the directory all the saves
+    # are in, so saves with the same name in different directories do not share one.
+    # A save given twice under different paths is only converted once.
+    save_paths = {}
+    for save_file in save_files:
+        save_paths.setdefault(os.path.abspath(save_file), save_file)
+    if not save_paths:
+        return {}
+    base = os.path.commonpath([os.path.dirname(path) for path in save_paths])
+    output_paths = {}
+    save_files_by_output = {}
+    for path, save_file in save_paths.items():
+        output_file = os.path.join(output_dir, os.path.splitext(os.path.relpath(path, base))[0] + '.json')
+        # e.g. a.dat and a.sav in the same directory
+        if output_file in save_files_by_output:
+            raise Exception(f'{save_files_by_output[output_file]} and {save_file} would both be written to {output_file}')
+        save_files_by_output[output_file] = save_file
+        output_paths[save_file] = output_file
+    return output_paths
+
+
+def convertSaves(save_files, output_dir, workers=None, indent=2, class_names=False) -> list:
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for save_file, output_file in outputPaths(save_files, output_dir).items():
+            os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+            futures.append(executor.submit(convertSave, save_file, output_file, indent, class_names))
+        for future in as_completed(futures):
+            result = future.result()
+            if result['error'] is not None:
+                print(f"FAILED {result['save_file']}: {result['error']}", file=sys.stderr)
+            results.append(result)
+    return results
+
+
+def printSummary(results, elapsed):
+    converted = [result for result in results if result['error'] is None]
+    failed = len(results) - len(converted)
+    total_bytes = sum(result['size'] for result in converted)
+    print(f'{len(converted)} converted, {failed} failed in {elapsed:.2f} s')
+    if elapsed > 0:
+        print(f'{len(converted) / elapsed:.1f} saves/s, {total_bytes / elapsed / 1e6:.2f} MB/s ({total_bytes} bytes)')
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Convert Interstellar Pilot saves to JSON')
+    parser.add_argument('paths', nargs='+', help='save files, directories or glob patterns')
+    parser.add_argument('-o', '--output-dir', default='.', help='directory the JSON files are written to')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--indent', type=int, default=2, help='JSON indent, negative for compact output')
+    parser.add_argument('--class-names', action='store_true', help='add the GameIDs name of every unit and cargo class')
+    args = parser.parse_args(argv)
+
+    save_files = findSaves(args.paths)
+    if not save_files:
+        parser.error('no save files found')
+
+    try:
+        outputPaths(save_files, args.output_dir)
+    except Exception as e:
+        parser.error(str(e))
+
+    indent = args.indent if args.indent >= 0 else None
+    start = time.perf_counter()
+    results = convertSaves(save_files, args.output_dir, args.workers, indent, args.class_names)
+    printSummary(results, time.perf_counter() - start)
+    return 1 if any(result['error'] is not None for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
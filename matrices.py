@@ -0,0 +1,199 @@
+import struct
+from array import array
+from columns import ARRAY_TYPECODES, NUMPY_DTYPES, numpy, useNumpy, layoutColumns, columnsStruct, columnsDtype
+from tools import SaveReader, SAVE_SECTIONS, FACTION_RELATION, FACTION_OPINION
+
+
+# Stored columns of the relation and opinion records. The relation's faction is the
+# id of its block, it is passed in and not stored with each record.
+_RELATION_COLUMNS = layoutColumns(FACTION_RELATION.fields)
+_OPINION_COLUMNS = layoutColumns(FACTION_OPINION.fields)
+_RELATION_LAYOUT = columnsStruct(_RELATION_COLUMNS)
+_OPINION_LAYOUT = columnsStruct(_OPINION_COLUMNS)
+
+# (matrix name, struct code) of every field besides the two faction ids, in stored order
+RELATION_MATRICES = [(name, code) for name, code in _RELATION_COLUMNS if name not in ('faction', 'other_faction')]
+OPINION_MATRICES = [(name, code) for name, code in _OPINION_COLUMNS if name not in ('faction', 'other_faction')]
+# has_relation and has_opinion tell a stored zero apart from a missing record
+MATRICES = [('has_relation', '?')] + RELATION_MATRICES + [('has_opinion', '?')] + OPINION_MATRICES
+
+# In the saves seen so far neutrality is -1 for hostile, 0 for neutral and 1 for allied
+HOSTILE = -1
+
+_RELATION_FIELDS = ['faction', 'other_faction'] + [name for name, _ in RELATION_MATRICES]
+_OPINION_FIELDS = ['faction', 'other_faction'] + [name for name, _ in OPINION_MATRICES]
+
+if numpy is not None:
+    _RELATION_DTYPE = columnsDtype(_RELATION_COLUMNS)
+    _OPINION_DTYPE = columnsDtype(_OPINION_COLUMNS)
+
+
+def _columnsByName(columns, rows, names) -> list:
+    # Columns of rows unpacked in the order of columns, in the order of names
+    if not rows:
+        return [[] for _ in names]
+    values = dict(zip([name for name, _ in columns], zip(*rows)))
+    return [values[name] for name in names]
+
+
+# Faction relations and opinions as N x N matrices indexed by dense faction index,
+# matrices[name][index[faction], index[other_faction]]. Matrices are 2D NumPy arrays
+# when NumPy is installed, otherwise flat array.array of N * N values in row order.
+# value, row and column work the same for both, e.g.
+#   matrices.value('neutrality', 8000, 100343)
+#   matrices.factionsWhere(matrices.row('opinion', 8000), lambda opinion: opinion < 0)
+class FactionMatrices:
+    def __init__(self, faction_ids, use_numpy=None):
+        self.use_numpy = useNumpy(use_numpy)
+        self.faction_ids = list(faction_ids)
+        self.index = {faction_id: index for index, faction_id in enumerate(self.faction_ids)}
+        self.size = size = len(self.faction_ids)
+        self.matrices = {}
+        for name, code in MATRICES:
+            if self.use_numpy:
+                self.matrices[name] = numpy.zeros((size, size), dtype=NUMPY_DTYPES[code])
+            else:
+                self.matrices[name] = array(ARRAY_TYPECODES[code], bytes(size * size * struct.calcsize(code)))
+
+    @classmethod
+    def fromRecords(cls, relations, opinions, faction_ids=None, use_numpy=None):
+        # From the record lists of readFactionRelations and readFactionOpinions
+        relation_columns = [[relation[name] for relation in relations] for name in _RELATION_FIELDS]
+        opinion_columns = [[opinion[name] for opinion in opinions] for name in _OPINION_FIELDS]
+        return cls._fromColumns(relation_columns, opinion_columns, faction_ids, use_numpy)
+
+    @classmethod
+    def _fromColumns(cls, relation_columns, opinion_columns, faction_ids, use_numpy):
+        # Columns are the faction ids, the other faction ids, then one column per matrix
+        if faction_ids is None:
+            faction_ids = set()
+            for columns in (relation_columns, opinion_columns):
+                faction_ids.update(columns[0])
+                faction_ids.update(columns[1])
+            faction_ids = sorted(faction_ids)
+        matrices = cls(faction_ids, use_numpy)
+        matrices._fill(relation_columns, RELATION_MATRICES, 'has_relation')
+        matrices._fill(opinion_columns, OPINION_MATRICES, 'has_opinion')
+        return matrices
+
+    def _fill(self, columns, names, present_name):
+        count = len(columns[0])
+        if not count:
+            return
+        index = self.index
+        unknown = (set(columns[0]) | set(columns[1])) - index.keys()
+        if unknown:
+            raise Exception(f'Unknown faction id {min(unknown)} in {present_name[4:]} records')
+        if self.use_numpy:
+            row_indexes = numpy.fromiter(map(index.__getitem__, columns[0]), dtype=numpy.intp, count=count)
+            column_indexes = numpy.fromiter(map(index.__getitem__, columns[1]), dtype=numpy.intp, count=count)
+            self.matrices[present_name][row_indexes, column_indexes] = True
+            for (name, _), values in zip(names, columns[2:]):
+                self.matrices[name][row_indexes, column_indexes] = values
+            return
+
+        size = self.size
+        cells = [index[faction_id] * size + index[other_faction_id] for faction_id, other_faction_id in zip(columns[0], columns[1])]
+        present = self.matrices[present_name]
+        for cell in cells:
+            present[cell] = 1
+        for (name, _), values in zip(names, columns[2:]):
+            target = self.matrices[name]
+            for cell, value in zip(cells, values):
+                target[cell] = value
+
+    def value(self, name, faction_id, other_faction_id):
+        row = self.index[faction_id]
+        column = self.index[other_faction_id]
+        if self.use_numpy:
+            return self.matrices[name][row, column].item()
+        value = self.matrices[name][row * self.size + column]
+        return bool(value) if self.matrices[name].typecode == 'B' else value
+
+    def row(self, name, faction_id):
+        # Values of faction_id towards every faction, in faction_ids order
+        row = self.index[faction_id]
+        if self.use_numpy:
+            return self.matrices[name][row]
+        return self.matrices[name][row * self.size:(row + 1) * self.size]
+
+    def column(self, name, other_faction_id):
+        # Values of every faction towards other_faction_id, in faction_ids order
+        column = self.index[other_faction_id]
+        if self.use_numpy:
+            return self.matrices[name][:, column]
+        return self.matrices[name][column::self.size]
+
+    def factionsWhere(self, values, predicate) -> list:
+        # Faction ids of the values in a row or column that match predicate. With
+        # NumPy predicate is called once with the whole array, e.g. lambda v: v < 0
+        if self.use_numpy:
+            return [self.faction_ids[index] for index in numpy.flatnonzero(predicate(values))]
+        return [self.faction_ids[index] for index, value in enumerate(values) if predicate(value)]
+
+    def hostileTo(self, faction_id) -> list:
+        # Factions whose relation towards faction_id is hostile
+        return self.factionsWhere(self.column('neutrality', faction_id), lambda neutrality: neutrality == HOSTILE)
+
+
+# Decodes the faction relation and opinion sections straight into FactionMatrices
+# without building a dict per record
+class MatrixSaveReader(SaveReader):
+    def __init__(self, data, use_numpy=None):
+        super().__init__(data)
+        self.use_numpy = useNumpy(use_numpy)
+
+    def readFactionMatrices(self, faction_ids=None) -> FactionMatrices:
+        # Reads both sections, which are stored one after the other
+        blocks = []
+        count = self.readInt32()
+        for _ in range(count):
+            faction_id = self.readInt32()
+            relation_count = self.readInt32()
+            blocks.append((faction_id, relation_count, self.position))
+            self.position += relation_count * _RELATION_LAYOUT.size
+
+        opinion_count = self.readInt32()
+        opinion_start = self.position
+        self.position += opinion_count * _OPINION_LAYOUT.size
+
+        if self.use_numpy:
+            relations = numpy.concatenate([numpy.empty(0, _RELATION_DTYPE)] + [
+                numpy.frombuffer(self.data, dtype=_RELATION_DTYPE, count=relation_count, offset=start)
+                for _, relation_count, start in blocks
+            ])
+            opinions = numpy.frombuffer(self.data, dtype=_OPINION_DTYPE, count=opinion_count, offset=opinion_start)
+            factions = numpy.repeat([block[0] for block in blocks], [block[1] for block in blocks])
+            # Ids as ints so faction_ids holds plain ints when it is collected from the columns
+            relation_columns = [factions.tolist(), relations['other_faction'].tolist()]
+            relation_columns += [relations[name] for name, _ in RELATION_MATRICES]
+            opinion_columns = [opinions['faction'].tolist(), opinions['other_faction'].tolist()]
+            opinion_columns += [opinions[name] for name, _ in OPINION_MATRICES]
+        else:
+            factions = []
+            rows = []
+            for faction_id, relation_count, start in blocks:
+                end = start + relation_count * _RELATION_LAYOUT.size
+                rows += _RELATION_LAYOUT.iter_unpack(self.data[start:end])
+                factions += [faction_id] * relation_count
+            relation_columns = [factions] + _columnsByName(_RELATION_COLUMNS, rows, _RELATION_FIELDS[1:])
+            end = opinion_start + opinion_count * _OPINION_LAYOUT.size
+            opinion_rows = list(_OPINION_LAYOUT.iter_unpack(self.data[opinion_start:end]))
+            opinion_columns = _columnsByName(_OPINION_COLUMNS, opinion_rows, _OPINION_FIELDS)
+        return FactionMatrices._fromColumns(relation_columns, opinion_columns, faction_ids, self.use_numpy)
+
+    def readSave(self, raw=False) -> dict:
+        # The faction_relations and faction_opinions sections are replaced by faction_matrices,
+        # raw only keeps the unit block as stored
+        save = {}
+        for name, method in SAVE_SECTIONS:
+            if name == 'faction_relations':
+                save['faction_matrices'] = self.readFactionMatrices([faction['id'] for faction in save['factions']])
+            elif name == 'faction_opinions':
+                # Read together with the relations by readFactionMatrices
+                continue
+            elif raw and name == 'units':
+                save[name] = self.readUnitSections()
+            else:
+                save[name] = getattr(self, method)()
+        return save
@@ -0,0 +1,123 @@
+import mmap
+from tools import (
+    SaveReader, FACTION, FACTION_RELATION, FACTION_OPINION, UNIT, CAPACITOR_CHARGE, ENGINE_TROTTLE,
+    ACTIVE_UNIT, UNIT_HEALTH, _INT32,
+)
+
+
+# Patched fields of the unit side tables, as {field in the layout: name in the key}
+_UNIT_TABLE_FIELDS = {
+    CAPACITOR_CHARGE: {'capacitor_charge': 'capacitor_charge'},
+    ENGINE_TROTTLE: {'trottle': 'trottle'},
+    ACTIVE_UNIT: {'active_data.velocity': 'velocity'},
+    UNIT_HEALTH: {'destoryed': 'destoryed', 'total_damage_recieved': 'total_damage_recieved', 'health': 'health'},
+}
+
+
+# Records where the fixed width fields that are commonly edited are stored, keyed by
+# ('header', field), ('faction', faction_id, field), ('unit', unit_id, field),
+# ('relation', faction_id, other_faction_id, field) and ('opinion', faction_id, other_faction_id).
+# Values are (offset, struct layout), taken from Layout.read_offsets and field_structs.
+class OffsetSaveReader(SaveReader):
+    def __init__(self, data):
+        super().__init__(data)
+        self.offsets = {}
+
+    def _addOffsets(self, key, layout, offsets, fields):
+        # fields maps field names in the layout to the last part of the key
+        for field, name in fields.items():
+            self.offsets[key + (name,)] = (offsets[field], layout.field_structs[field])
+
+    def readHeader(self) -> dict:
+        # The header is not a Layout, credits is the last field when there is a player
+        header = super().readHeader()
+        if header['has_player']:
+            self.offsets[('header', 'credits')] = (self.position - _INT32.size, _INT32)
+        return header
+
+    def _readFaction(self) -> dict:
+        faction, offsets = FACTION.read_offsets(self)
+        self._addOffsets(('faction', faction['id']), FACTION, offsets, {'credits': 'credits'})
+        return faction
+
+    def _readFactionRelation(self, faction_id) -> dict:
+        relation, offsets = FACTION_RELATION.read_offsets(self, faction_id)
+        key = ('relation', faction_id, relation['other_faction'])
+        fields = {name: name for name in ('permanent_peace', 'neutrality', 'recent_damage_recieved')}
+        self._addOffsets(key, FACTION_RELATION, offsets, fields)
+        return relation
+
+    def _readFactionOpinion(self) -> dict:
+        opinion, offsets = FACTION_OPINION.read_offsets(self)
+        key = ('opinion', opinion['faction'], opinion['other_faction'])
+        self.offsets[key] = (offsets['opinion'], FACTION_OPINION.field_structs['opinion'])
+        return opinion
+
+    def _readUnit(self):
+        unit, offsets = UNIT.read_offsets(self)
+        fields = {name: name for name in ('sector', 'position', 'rotation', 'faction')}
+        self._addOffsets(('unit', unit['id']), UNIT, offsets, fields)
+        return unit
+
+    def _iterRecords(self, layout):
+        fields = _UNIT_TABLE_FIELDS.get(layout)
+        if fields is None:
+            yield from super()._iterRecords(layout)
+            return
+        count = self.readInt32()
+        for _ in range(count):
+            record, offsets = layout.read_offsets(self)
+            self._addOffsets(('unit', record['unit_id']), layout, offsets, fields)
+            yield record
+
+
+# Overwrites fixed width fields in place, e.g.
+#   patcher.patch(('faction', 3, 'credits'), 50000)
+#   patcher.patch(('unit', 101035, 'position'), (0, 0, 0))
+class SavePatcher:
+    def __init__(self, data, offsets=None):
+        self.data = data
+        if offsets is None:
+            reader = OffsetSaveReader(data)
+            reader.readSave()
+            offsets = reader.offsets
+        self.offsets = offsets
+        self._mapped = None
+
+    @classmethod
+    def fromPath(cls, path, offsets=None):
+        # Changes are written straight to the file through a writable memory map
+        with open(path, 'r+b') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE)
+        patcher = cls(mapped, offsets)
+        patcher._mapped = mapped
+        return patcher
+
+    def close(self):
+        if self._mapped is not None:
+            self._mapped.flush()
+            self._mapped.close()
+            self._mapped = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def patch(self, key, value):
+        offset, layout = self.offsets[key]
+        if isinstance(value, (tuple, list)):
+            layout.pack_into(self.data, offset, *value)
+        else:
+            layout.pack_into(self.data, offset, value)
+
+    def patchMany(self, changes):
+        offsets = self.offsets
+        data = self.data
+        for key, value in changes.items():
+            offset, layout = offsets[key]
+            if isinstance(value, (tuple, list)):
+                layout.pack_into(data, offset, *value)
+            else:
+                layout.pack_into(data, offset, value)
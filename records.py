@@ -0,0 +1,63 @@
+from schema import RECORD_CLASSES, toDict
+from tools import (
+    SaveReader, SECTOR, FACTION, PATROL_PATH, FACTION_RELATION, FACTION_OPINION, UNIT_CARGO,
+    SHIP_TRADER_ENTRY, PROJECTILE_DATA, UNIT, COMPONENT_CARGO,
+)
+
+
+# The record class of every layout in tools.py under its layout name, e.g. Unit,
+# UnitComponentData, Faction, Sector or FactionRelation
+globals().update(RECORD_CLASSES)
+
+
+# Decodes records into the __slots__ classes of the layouts instead of dicts, which
+# take a fraction of the memory. Fields are attributes (unit.sector, unit.class_) and
+# can still be read like dict keys, so SaveWriter, diff.py and spatial.py accept them.
+# toDict converts them to the dicts SaveReader returns, e.g. for JSON export.
+class RecordSaveReader(SaveReader):
+    def _readSector(self):
+        return SECTOR.read_record(self)
+
+    def _readFaction(self):
+        return FACTION.read_record(self)
+
+    def _readPatrolPath(self):
+        return PATROL_PATH.read_record(self)
+
+    def _readFactionRelation(self, faction_id):
+        return FACTION_RELATION.read_record(self, faction_id)
+
+    def _readFactionOpinion(self):
+        return FACTION_OPINION.read_record(self)
+
+    def _readUnitCargo(self):
+        return UNIT_CARGO.read_record(self)
+
+    def _readShipTrader(self) -> list:
+        count = self.readInt32()
+        read = SHIP_TRADER_ENTRY.read_record
+        return [read(self) for _ in range(count)]
+
+    def _readProjectileData(self):
+        return PROJECTILE_DATA.read_record(self)
+
+    def _readUnit(self):
+        return UNIT.read_record(self)
+
+    def _readRecord(self, layout, *params):
+        return layout.read_record(self, *params)
+
+    def _iterRecords(self, layout):
+        count = self.readInt32()
+        read = layout.read_record
+        for _ in range(count):
+            yield read(self)
+
+    def iterUnitComponentCargo(self):
+        count = self.readInt32()
+        read = COMPONENT_CARGO.read_record
+        for _ in range(count):
+            unit_id = self.readInt32()
+            count = self.readInt32()
+            for _ in range(count):
+                yield read(self, unit_id)
@@ -0,0 +1,33 @@
+import glob
+import sys
+import time
+from instrument import instrument
+from tools import SaveReader, SaveWriter
+
+
+def checkRoundTrip(save_file) -> bool:
+    with open(save_file, 'rb') as f:
+        data = f.read()
+
+    reader = SaveReader(data)
+    save = reader.readSave(raw=True)
+    remaining = reader.readRemaining()
+
+    start = time.perf_counter()
+    encoded = SaveWriter(len(data)).writeSave(save, remaining, raw=True)
+    elapsed = time.perf_counter() - start
+
+    # The instrumented reader must decode the same save, keyword arguments included
+    instrumented_reader = SaveReader(data)
+    with instrument(instrumented_reader):
+        instrumented = instrumented_reader.readSave(raw=True)
+
+    matches = encoded == data and instrumented == save
+    print(f"{save_file:<32} {'ok' if matches else 'MISMATCH':<8} written in {elapsed * 1000:7.2f} ms")
+    return matches
+
+
+if __name__ == '__main__':
+    save_files = sys.argv[1:] or sorted(glob.glob('saves/*.dat'))
+    results = [checkRoundTrip(save_file) for save_file in save_files]
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,564 @@
+import functools
+import keyword
+import struct
+
+
+# Field types stored with a fixed width, as struct codes
+FIXED_TYPES = {
+    'i': 'i',
+    'f': 'f',
+    'Q': 'Q',
+    '?': '?',
+    'B': 'B',
+    'vector3': '3f',
+    'vector4': '4f',
+}
+
+_VECTOR_WIDTHS = {'3f': 3, '4f': 4}
+
+# Reader and Writer methods used for single values outside of a merged struct
+_READ_METHODS = {'i': 'readInt32', 'f': 'readSingle', 'Q': 'readDouble', '?': 'readBoolean', 'B': 'readByte'}
+_WRITE_METHODS = {'i': 'writeInt32', 'f': 'writeSingle', 'Q': 'writeDouble', '?': 'writeBoolean', 'B': 'writeByte'}
+
+
+class List:
+    # A count prefixed list of a field type, a struct format (tuples) or a Layout
+    def __init__(self, item, count='i'):
+        self.item = item
+        self.count = count
+
+
+class If:
+    # Fields only stored when condition holds for the fields read before it
+    def __init__(self, condition, then, otherwise=()):
+        self.condition = condition
+        self.then = then
+        self.otherwise = otherwise
+
+
+class In:
+    def __init__(self, field, values):
+        self.field = field
+        self.values = values
+
+
+class Equals:
+    def __init__(self, field, value):
+        self.field = field
+        self.value = value
+
+
+class Invalid:
+    # Raises when reached, for data that should never be present
+    def __init__(self, message):
+        self.message = message
+
+
+# Field value passed to the reader by the caller instead of being stored in the record
+PARAM = 'param'
+
+
+class Record:
+    # Base of the __slots__ class generated for each Layout. Fields are attributes, with
+    # a trailing _ when the name is a keyword (unit.class_), and can be used like the
+    # keys of the dict records (unit['class']), so writers and other tools accept both.
+    # Fields of If branches that were not taken are left unset.
+    __slots__ = ()
+    _fields = ()
+    _attributes = {}
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, self._attributes[key])
+        except (KeyError, AttributeError):
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        setattr(self, self._attributes[key], value)
+
+    def __delitem__(self, key):
+        try:
+            delattr(self, self._attributes[key])
+        except (KeyError, AttributeError):
+            raise KeyError(key) from None
+
+    def __contains__(self, key) -> bool:
+        attribute = self._attributes.get(key)
+        return attribute is not None and hasattr(self, attribute)
+
+    def get(self, key, default=None):
+        attribute = self._attributes.get(key)
+        return default if attribute is None else getattr(self, attribute, default)
+
+    def pop(self, key, *default):
+        try:
+            value = self[key]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+        del self[key]
+        return value
+
+    def keys(self) -> list:
+        return [key for key, attribute in self._fields if hasattr(self, attribute)]
+
+    def items(self) -> list:
+        return [(key, getattr(self, attribute)) for key, attribute in self._fields if hasattr(self, attribute)]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return dict(self.items()) == dict(other.items())
+        if isinstance(other, dict):
+            return dict(self.items()) == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{key}={value!r}' for key, value in self.items())
+        return f'{type(self).__name__}({fields})'
+
+    def toDict(self) -> dict:
+        return {key: toDict(value) for key, value in self.items()}
+
+
+def toDict(value):
+    # Records, including the ones nested in lists, as the dicts the default readers return
+    if isinstance(value, Record):
+        return value.toDict()
+    if isinstance(value, list):
+        return [toDict(item) for item in value]
+    return value
+
+
+def _fieldNames(fields) -> list:
+    names = []
+    for field in fields:
+        if isinstance(field, If):
+            names += _fieldNames(field.then) + _fieldNames(field.otherwise)
+        elif isinstance(field, tuple):
+            names.append(field[0])
+    return names
+
+
+# Record class of every Layout by name. They are looked up by the module __getattr__
+# below, so pickle finds them as schema.<name>.
+RECORD_CLASSES = {}
+
+
+def __getattr__(name):
+    try:
+        return RECORD_CLASSES[name]
+    except KeyError:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}') from None
+
+
+def _recordClass(name, fields, extra):
+    if name in RECORD_CLASSES or name in globals():
+        raise Exception(f'Duplicate record name {name}')
+    attributes = {}
+    for key in _fieldNames(fields) + list(extra):
+        attributes[key] = key + '_' if keyword.iskeyword(key) else key
+    RECORD_CLASSES[name] = type(name, (Record,), {
+        '__slots__': tuple(attributes.values()),
+        '_fields': tuple(attributes.items()),
+        '_attributes': attributes,
+        '__module__': __name__,
+    })
+    return RECORD_CLASSES[name]
+
+
+def _itemSize(item):
+    # Bytes taken by one List item, None when it is not fixed width
+    if isinstance(item, Layout):
+        return item.size
+    if item == 'string':
+        return None
+    return struct.calcsize('<' + FIXED_TYPES.get(item, item))
+
+
+def _fixedSize(fields):
+    # Bytes taken by fields when they are all fixed width, otherwise None
+    size = 0
+    for field in fields:
+        if not isinstance(field, tuple):
+            return None
+        _, field_type = field
+        if isinstance(field_type, Layout):
+            if field_type.size is None:
+                return None
+            size += field_type.size
+        elif field_type in FIXED_TYPES:
+            size += struct.calcsize('<' + FIXED_TYPES[field_type])
+        elif field_type != PARAM:
+            return None
+    return size
+
+
+def _fieldStructs(fields) -> dict:
+    # Struct of every fixed width field by name, nested layout fields as 'name.field'
+    structs = {}
+    for field in fields:
+        if isinstance(field, If):
+            structs.update(_fieldStructs(field.then))
+            structs.update(_fieldStructs(field.otherwise))
+        elif isinstance(field, tuple):
+            name, field_type = field
+            if isinstance(field_type, Layout):
+                structs.update({f'{name}.{path}': value for path, value in field_type.field_structs.items()})
+            elif field_type in FIXED_TYPES:
+                structs[name] = struct.Struct('<' + FIXED_TYPES[field_type])
+    return structs
+
+
+def _conditionFields(fields) -> set:
+    # Names of the fields that If conditions test, nested layouts test their own fields
+    names = set()
+    for field in fields:
+        if isinstance(field, If):
+            condition = field.condition
+            names.add(condition if isinstance(condition, str) else condition.field)
+            names |= _conditionFields(field.then) | _conditionFields(field.otherwise)
+    return names
+
+
+class Layout:
+    # A record declared as a list of (name, type) fields, If blocks and Invalid markers.
+    # read(reader, *params) and write(writer, record) are generated from the declaration,
+    # and read_record(reader, *params) reads into an instance of record_class instead of
+    # a dict. extra names fields that are not stored in the record but filled in later.
+    # size is the byte size of a record when every field is fixed width, otherwise None,
+    # and field_structs the struct of each fixed width field for patching it in place.
+    def __init__(self, name, fields, extra=()):
+        self.name = name
+        self.fields = fields
+        self.params = [field[0] for field in fields if isinstance(field, tuple) and field[1] == PARAM]
+        self.record_class = _recordClass(name, fields, extra)
+        self.size = _fixedSize(fields)
+        self.field_structs = _fieldStructs(fields)
+
+        reader = _ReaderCompiler(self)
+        self.read = reader.build()
+        self.read_source = reader.source
+
+        writer = _WriterCompiler(self)
+        self.write = writer.build()
+        self.write_source = writer.source
+        self.read_record_source = None
+        self.read_offsets_source = None
+        self.skip_source = None
+
+    @functools.cached_property
+    def read_record(self):
+        # Generated on first use, as most programs only read dicts
+        reader = _ReaderCompiler(self, records=True)
+        read_record = reader.build()
+        self.read_record_source = reader.source
+        return read_record
+
+    @functools.cached_property
+    def read_offsets(self):
+        # read_offsets(reader, *params) returns the record dict and the position each
+        # field is stored at, with nested layout fields as 'name.field'
+        reader = _ReaderCompiler(self, offsets=True)
+        read_offsets = reader.build()
+        self.read_offsets_source = reader.source
+        return read_offsets
+
+    @functools.cached_property
+    def skip(self):
+        # skip(reader, *params) moves past a record, reading only the fields If
+        # conditions test, and returns those fields as a dict
+        skipper = _SkipCompiler(self)
+        skip = skipper.build()
+        self.skip_source = skipper.source
+        return skip
+
+
+class _Compiler:
+    def __init__(self):
+        self.namespace = {}
+        self.source = None
+        self.lines = []
+        self.counter = 0
+        self.run = []
+
+    def constant(self, value, prefix) -> str:
+        name = f'{prefix}{len(self.namespace)}'
+        self.namespace[name] = value
+        return name
+
+    def key(self, target, name) -> str:
+        return f'{target}[{name!r}]'
+
+    def variable(self, prefix) -> str:
+        self.counter += 1
+        return f'{prefix}{self.counter}'
+
+    def condition(self, condition, target) -> str:
+        if isinstance(condition, str):
+            return self.key(target, condition)
+        if isinstance(condition, In):
+            return f'{self.key(target, condition.field)} in {self.constant(condition.values, "VALUES")}'
+        if isinstance(condition, Equals):
+            return f'{self.key(target, condition.field)} == {condition.value!r}'
+        raise Exception(f'Unknown condition {condition!r}')
+
+    def block(self, fields, target, indent):
+        start = len(self.lines)
+        self.fields(fields, target, indent)
+        self.flush(indent)
+        if len(self.lines) == start:
+            self.lines.append(indent + 'pass')
+
+    def fields(self, fields, target, indent):
+        for field in fields:
+            if isinstance(field, If):
+                self.flush(indent)
+                self.lines.append(f'{indent}if {self.condition(field.condition, target)}:')
+                self.block(field.then, target, indent + '    ')
+                if field.otherwise:
+                    self.lines.append(f'{indent}else:')
+                    self.block(field.otherwise, target, indent + '    ')
+            elif isinstance(field, Invalid):
+                self.flush(indent)
+                self.lines.append(f'{indent}raise Exception({field.message!r})')
+            else:
+                name, field_type = field
+                self.field(name, field_type, target, indent)
+
+    def build(self):
+        self.source = '\n'.join(self.lines) + '\n'
+        exec(self.source, self.namespace)
+        return self.namespace[self.function_name]
+
+
+class _ReaderCompiler(_Compiler):
+    def __init__(self, layout, records=False, offsets=False):
+        super().__init__()
+        self.records = records
+        self.offsets = offsets
+        # Field name prefix of each record variable, for the offsets
+        self.paths = {'record': ''}
+        params = ''.join(', ' + param for param in layout.params)
+        if records:
+            self.function_name = f'read{layout.name}Record'
+        elif offsets:
+            self.function_name = f'read{layout.name}Offsets'
+        else:
+            self.function_name = f'read{layout.name}'
+        self.lines.append(f'def {self.function_name}(reader{params}):')
+        self.lines.append(f'    record = {self.new(layout)}')
+        if offsets:
+            self.lines.append('    offsets = {}')
+        self.block(layout.fields, 'record', '    ')
+        self.lines.append('    return record, offsets' if offsets else '    return record')
+
+    def key(self, target, name) -> str:
+        if self.records:
+            return f'{target}.{name}_' if keyword.iskeyword(name) else f'{target}.{name}'
+        return super().key(target, name)
+
+    def new(self, layout) -> str:
+        if self.records:
+            return f'{self.constant(layout.record_class, "CLASS")}()'
+        return '{}'
+
+    def flush(self, indent):
+        codes = ''.join(op[1] for op in self.run if op[0] == 'value')
+        if codes:
+            layout = self.constant(struct.Struct('<' + codes), 'STRUCT')
+            if self.offsets:
+                self.lines.append(f'{indent}start = reader.position')
+            self.lines.append(f'{indent}values = reader.readStruct({layout})')
+        index = 0
+        offset = 0
+        for op in self.run:
+            if op[0] == 'line':
+                self.lines.append(indent + op[1])
+                continue
+            _, code, target, path = op
+            if self.offsets:
+                self.lines.append(f'{indent}offsets[{path!r}] = start + {offset}')
+                offset += struct.calcsize('<' + code)
+            width = _VECTOR_WIDTHS.get(code, 1)
+            if width > 1:
+                self.lines.append(f'{indent}{target} = values[{index}:{index + width}]')
+            else:
+                self.lines.append(f'{indent}{target} = values[{index}]')
+            index += width
+        self.run = []
+
+    def item(self, item) -> str:
+        if isinstance(item, Layout):
+            read = item.read_record if self.records else item.read
+            return f'{self.constant(read, "READ")}(reader)'
+        if item in _READ_METHODS:
+            return f'reader.{_READ_METHODS[item]}()'
+        if item == 'string':
+            return 'reader.readString()'
+        return f'reader.readStruct({self.constant(struct.Struct("<" + item), "STRUCT")})'
+
+    def position(self, path, indent):
+        if self.offsets:
+            self.lines.append(f'{indent}offsets[{path!r}] = reader.position')
+
+    def field(self, name, field_type, target, indent):
+        key = self.key(target, name)
+        path = self.paths[target] + name
+        if field_type == PARAM:
+            self.run.append(('line', f'{key} = {name}'))
+        elif isinstance(field_type, str) and field_type in FIXED_TYPES:
+            self.run.append(('value', FIXED_TYPES[field_type], key, path))
+        elif field_type == 'string':
+            self.flush(indent)
+            self.position(path, indent)
+            self.lines.append(f'{indent}{key} = reader.readString()')
+        elif isinstance(field_type, Layout):
+            # Inlined so its fixed width fields merge with the surrounding ones
+            variable = self.variable('record')
+            self.paths[variable] = path + '.'
+            self.run.append(('line', f'{variable} = {self.new(field_type)}'))
+            self.run.append(('line', f'{key} = {variable}'))
+            self.fields(field_type.fields, variable, indent)
+        elif isinstance(field_type, List):
+            self.flush(indent)
+            self.position(path, indent)
+            count = self.variable('count')
+            items = self.variable('items')
+            self.lines.append(f'{indent}{count} = reader.{_READ_METHODS[field_type.count]}()')
+            self.lines.append(f'{indent}{items} = []')
+            self.lines.append(f'{indent}{key} = {items}')
+            self.lines.append(f'{indent}for _ in range({count}):')
+            self.lines.append(f'{indent}    {items}.append({self.item(field_type.item)})')
+        else:
+            raise Exception(f'Unknown field type {field_type!r} for {name}')
+
+
+class _WriterCompiler(_Compiler):
+    def __init__(self, layout):
+        super().__init__()
+        self.function_name = f'write{layout.name}'
+        self.lines.append(f'def {self.function_name}(writer, record):')
+        self.block(layout.fields, 'record', '    ')
+
+    def flush(self, indent):
+        if self.run:
+            codes = ''.join(code for code, _ in self.run)
+            layout = self.constant(struct.Struct('<' + codes), 'STRUCT')
+            values = ', '.join(value for _, value in self.run)
+            self.lines.append(f'{indent}writer.writeStruct({layout}, {values})')
+        self.run = []
+
+    def item(self, item, value) -> str:
+        if isinstance(item, Layout):
+            return f'{self.constant(item.write, "WRITE")}(writer, {value})'
+        if item in _WRITE_METHODS:
+            return f'writer.{_WRITE_METHODS[item]}({value})'
+        if item == 'string':
+            return f'writer.writeString({value})'
+        return f'writer.writeStruct({self.constant(struct.Struct("<" + item), "STRUCT")}, *{value})'
+
+    def field(self, name, field_type, target, indent):
+        key = f'{target}[{name!r}]'
+        if field_type == PARAM:
+            return
+        elif isinstance(field_type, str) and field_type in FIXED_TYPES:
+            code = FIXED_TYPES[field_type]
+            self.run.append((code, '*' + key if code in _VECTOR_WIDTHS else key))
+        elif field_type == 'string':
+            self.flush(indent)
+            self.lines.append(f'{indent}writer.writeString({key})')
+        elif isinstance(field_type, Layout):
+            # Nothing is written here, so the variable can be bound before the pending struct
+            variable = self.variable('record')
+            self.lines.append(f'{indent}{variable} = {key}')
+            self.fields(field_type.fields, variable, indent)
+        elif isinstance(field_type, List):
+            self.flush(indent)
+            items = self.variable('items')
+            self.lines.append(f'{indent}{items} = {key}')
+            self.lines.append(f'{indent}writer.{_WRITE_METHODS[field_type.count]}(len({items}))')
+            self.lines.append(f'{indent}for item in {items}:')
+            self.lines.append(f'{indent}    {self.item(field_type.item, "item")}')
+        else:
+            raise Exception(f'Unknown field type {field_type!r} for {name}')
+
+
+class _SkipCompiler(_Compiler):
+    def __init__(self, layout):
+        super().__init__()
+        # Fields read instead of skipped, by record variable
+        self.needed = {'record': _conditionFields(layout.fields)}
+        params = ''.join(', ' + param for param in layout.params)
+        self.function_name = f'skip{layout.name}'
+        self.lines.append(f'def {self.function_name}(reader{params}):')
+        self.lines.append('    record = {}')
+        self.block(layout.fields, 'record', '    ')
+        self.lines.append('    return record')
+
+    def flush(self, indent):
+        # Fields no condition tests are struct pad bytes, or skipped outright when the
+        # whole run is unused
+        if not self.run:
+            return
+        codes = ''.join(code if key else f'{struct.calcsize("<" + code)}x' for code, key in self.run)
+        used = [(code, key) for code, key in self.run if key]
+        if not used:
+            self.lines.append(f'{indent}reader.position += {struct.calcsize("<" + codes)}')
+        else:
+            layout = self.constant(struct.Struct('<' + codes), 'STRUCT')
+            self.lines.append(f'{indent}values = reader.readStruct({layout})')
+            for index, (code, key) in enumerate(used):
+                self.lines.append(f'{indent}{key} = values[{index}]')
+        self.run = []
+
+    def skipString(self, indent):
+        lenght = self.variable('lenght')
+        self.lines.append(f'{indent}{lenght} = reader.read7BitInt()')
+        self.lines.append(f'{indent}reader.position += {lenght}')
+
+    def field(self, name, field_type, target, indent):
+        key = self.key(target, name) if name in self.needed[target] else None
+        if field_type == PARAM:
+            if key:
+                self.lines.append(f'{indent}{key} = {name}')
+        elif isinstance(field_type, str) and field_type in FIXED_TYPES:
+            code = FIXED_TYPES[field_type]
+            # Vectors are never tested
+            self.run.append((code, key if code not in _VECTOR_WIDTHS else None))
+        elif field_type == 'string':
+            self.flush(indent)
+            if key:
+                self.lines.append(f'{indent}{key} = reader.readString()')
+            else:
+                self.skipString(indent)
+        elif isinstance(field_type, Layout):
+            variable = self.variable('record')
+            self.needed[variable] = _conditionFields(field_type.fields)
+            if self.needed[variable]:
+                # Binding the variable before the pending struct is read does not move the reader
+                self.lines.append(f'{indent}{variable} = {{}}')
+            self.fields(field_type.fields, variable, indent)
+        elif isinstance(field_type, List):
+            self.flush(indent)
+            count = self.variable('count')
+            self.lines.append(f'{indent}{count} = reader.{_READ_METHODS[field_type.count]}()')
+            size = _itemSize(field_type.item)
+            if size is not None:
+                self.lines.append(f'{indent}reader.position += {count} * {size}')
+            elif field_type.item == 'string':
+                self.lines.append(f'{indent}for _ in range({count}):')
+                self.skipString(indent + '    ')
+            else:
+                self.lines.append(f'{indent}for _ in range({count}):')
+                self.lines.append(f'{indent}    {self.constant(field_type.item.skip, "SKIP")}(reader)')
+        else:
+            raise Exception(f'Unknown field type {field_type!r} for {name}')
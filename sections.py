@@ -0,0 +1,125 @@
+import json
+import os
+from tools import (
+    SaveReader, SAVE_SECTIONS, UNIT_SECTIONS, UNIT_TABLE_LAYOUTS, SECTOR, FACTION, PATROL_PATH,
+    FACTION_RELATION, FACTION_OPINION, UNIT,
+)
+
+
+_SECTION_METHODS = dict(SAVE_SECTIONS)
+
+
+# Skims a save once to find where each top level section starts, then decodes
+# only the sections that are asked for, e.g. reader.units or reader.readSection('factions').
+class LazySaveReader(SaveReader):
+    def __init__(self, data, offsets=None):
+        super().__init__(data)
+        self.offsets = offsets
+        self.unit_offsets = None
+        self._sections = {}
+
+    @classmethod
+    def fromPath(cls, path, offset_cache=None):
+        reader = super().fromPath(path)
+        if offset_cache is None:
+            return reader
+
+        key = os.path.abspath(path)
+        stat = os.stat(path)
+        cache = {}
+        if os.path.exists(offset_cache):
+            with open(offset_cache) as f:
+                cache = json.load(f)
+
+        entry = cache.get(key)
+        if entry is not None and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            reader.offsets = entry['offsets']
+        else:
+            cache[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'offsets': reader.skim()}
+            with open(offset_cache, 'w') as f:
+                json.dump(cache, f)
+        return reader
+
+    def __getattr__(self, name):
+        if name in _SECTION_METHODS:
+            return self.readSection(name)
+        raise AttributeError(name)
+
+    def skim(self) -> dict:
+        offsets = {}
+        self.position = 0
+        for name, _ in SAVE_SECTIONS:
+            offsets[name] = self.position
+            self._skimmers[name](self)
+        offsets['end'] = self.position
+        offsets['unit_sections'] = self.unit_offsets
+        self.offsets = offsets
+        return offsets
+
+    def readSection(self, name):
+        if name not in self._sections:
+            if self.offsets is None:
+                self.skim()
+            self.position = self.offsets[name]
+            self._sections[name] = getattr(self, _SECTION_METHODS[name])()
+        return self._sections[name]
+
+    def _skipRecords(self, layout):
+        count = self.readInt32()
+        if layout.size is not None:
+            self.position += count * layout.size
+        else:
+            skip = layout.skip
+            for _ in range(count):
+                skip(self)
+
+    def _skimHeader(self):
+        self.readHeader()
+
+    def _skimSecondsEslapsed(self):
+        self.readDouble()
+
+    def _skimSectors(self):
+        self._skipRecords(SECTOR)
+
+    def _skimFactions(self):
+        self._skipRecords(FACTION)
+
+    def _skimPatrolPaths(self):
+        self._skipRecords(PATROL_PATH)
+
+    def _skimFactionRelations(self):
+        count = self.readInt32()
+        for _ in range(count):
+            self.readInt32()
+            self._skipRecords(FACTION_RELATION)
+
+    def _skimFactionOpinions(self):
+        self._skipRecords(FACTION_OPINION)
+
+    def _skimUnits(self):
+        # Also records where each of the UNIT_SECTIONS tables starts
+        unit_offsets = {}
+        for name, _ in UNIT_SECTIONS:
+            unit_offsets[name] = self.position
+            if name == 'units':
+                self._skipRecords(UNIT)
+            elif name == 'cloaked_units':
+                count = self.readInt32()
+                for _ in range(count):
+                    self.readInt32()
+            else:
+                self._skipRecords(UNIT_TABLE_LAYOUTS[name])
+        unit_offsets['end'] = self.position
+        self.unit_offsets = unit_offsets
+
+    _skimmers = {
+        'header': _skimHeader,
+        'seconds_eslapsed': _skimSecondsEslapsed,
+        'sectors': _skimSectors,
+        'factions': _skimFactions,
+        'patrol_paths': _skimPatrolPaths,
+        'faction_relations': _skimFactionRelations,
+        'faction_opinions': _skimFactionOpinions,
+        'units': _skimUnits,
+    }
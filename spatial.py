@@ -0,0 +1,136 @@
+import math
+
+
+DEFAULT_CELL_SIZE = 1000.0
+
+
+# Points bucketed into cubes of cell_size, building is a single pass over the points
+class GridIndex:
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _cell(self, position) -> tuple:
+        size = self.cell_size
+        return (math.floor(position[0] / size), math.floor(position[1] / size), math.floor(position[2] / size))
+
+    def insert(self, position, item):
+        cell = self._cell(position)
+        points = self.cells.get(cell)
+        if points is None:
+            points = self.cells[cell] = []
+        points.append((position, item))
+        self.count += 1
+
+    def _cellDistance(self, cell, position) -> float:
+        # Lower bound of the distance from position to any point in cell
+        size = self.cell_size
+        total = 0.0
+        for index, value in zip(cell, position):
+            low = index * size
+            if value < low:
+                total += (low - value) ** 2
+            elif value > low + size:
+                total += (value - low - size) ** 2
+        return math.sqrt(total)
+
+    def _cellsNear(self, position, radius) -> list:
+        # Cells that can hold points within radius of position
+        if math.isinf(radius):
+            return list(self.cells.values())
+        low = self._cell([value - radius for value in position])
+        high = self._cell([value + radius for value in position])
+        span = (high[0] - low[0] + 1) * (high[1] - low[1] + 1) * (high[2] - low[2] + 1)
+        if span > len(self.cells):
+            return [points for cell, points in self.cells.items() if self._cellDistance(cell, position) <= radius]
+
+        cells = []
+        for x in range(low[0], high[0] + 1):
+            for y in range(low[1], high[1] + 1):
+                for z in range(low[2], high[2] + 1):
+                    points = self.cells.get((x, y, z))
+                    if points is not None:
+                        cells.append(points)
+        return cells
+
+    def within(self, position, radius, predicate=None) -> list:
+        # (distance, item) of every point within radius, nearest first
+        found = []
+        for points in self._cellsNear(position, radius):
+            for point, item in points:
+                distance = math.dist(point, position)
+                if distance <= radius and (predicate is None or predicate(item)):
+                    found.append((distance, item))
+        found.sort(key=lambda entry: entry[0])
+        return found
+
+    def nearest(self, position, predicate=None, max_distance=math.inf):
+        # (distance, item) of the nearest point, or None if there is none within max_distance.
+        # Cells are visited nearest first and the search stops once no closer point is possible.
+        candidates = sorted((self._cellDistance(cell, position), cell) for cell in self.cells)
+        best = None
+        best_distance = max_distance
+        for cell_distance, cell in candidates:
+            if cell_distance > best_distance:
+                break
+            for point, item in self.cells[cell]:
+                distance = math.dist(point, position)
+                if distance <= best_distance and (predicate is None or predicate(item)):
+                    best = (distance, item)
+                    best_distance = distance
+        return best
+
+
+# Unit and patrol path node positions indexed per sector, e.g.
+#   index = SpatialIndex.fromSave(SaveReader.fromPath(path).readSave())
+#   index.unitsWithin(unit['sector'], unit['position'], 5000)
+#   index.nearestUnit(unit['sector'], unit['position'], predicate=lambda other: other['faction'] == 3)
+# Patrol nodes are indexed as (path, node) pairs.
+class SpatialIndex:
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self.units = {}
+        self.patrol_nodes = {}
+
+    @classmethod
+    def fromSave(cls, save, cell_size=DEFAULT_CELL_SIZE):
+        index = cls(cell_size)
+        index.addUnits(save['units'])
+        index.addPatrolPaths(save['patrol_paths'])
+        return index
+
+    def _sectorIndex(self, indexes, sector) -> GridIndex:
+        grid = indexes.get(sector)
+        if grid is None:
+            grid = indexes[sector] = GridIndex(self.cell_size)
+        return grid
+
+    def addUnits(self, units):
+        for unit in units:
+            self._sectorIndex(self.units, unit['sector']).insert(unit['position'], unit)
+
+    def addPatrolPaths(self, paths):
+        for path in paths:
+            grid = self._sectorIndex(self.patrol_nodes, path['sector'])
+            for node in path['nodes']:
+                grid.insert(node['position'], (path, node))
+
+    def unitsWithin(self, sector, position, radius, predicate=None) -> list:
+        grid = self.units.get(sector)
+        return grid.within(position, radius, predicate) if grid is not None else []
+
+    def nearestUnit(self, sector, position, predicate=None, max_distance=math.inf):
+        grid = self.units.get(sector)
+        return grid.nearest(position, predicate, max_distance) if grid is not None else None
+
+    def patrolNodesWithin(self, sector, position, radius, predicate=None) -> list:
+        grid = self.patrol_nodes.get(sector)
+        return grid.within(position, radius, predicate) if grid is not None else []
+
+    def nearestPatrolNode(self, sector, position, predicate=None, max_distance=math.inf):
+        grid = self.patrol_nodes.get(sector)
+        return grid.nearest(position, predicate, max_distance) if grid is not None else None
@@ -1,70 +1,430 @@
+import mmap
 import struct
+from gameids import GAME_IDS
+from schema import Layout, List, If, In, Equals, Invalid, PARAM
+
+
+_INT32 = struct.Struct('<i')
+_SINGLE = struct.Struct('<f')
+_DOUBLE = struct.Struct('<Q')
+_BOOLEAN = struct.Struct('<?')
+_BYTE = struct.Struct('<B')
+_VECTOR3 = struct.Struct('<3f')
+_VECTOR4 = struct.Struct('<4f')
+
+# Sections of the unit block in the order they are stored and the SaveReader method reading each
+UNIT_SECTIONS = [
+    ('units', 'iterUnits'),
+    ('names', 'iterUnitNames'),
+    ('component_data', 'iterUnitComponentData'),
+    ('modded_components', 'iterModdedComponents'),
+    ('capacitor_charges', 'iterCapacitorCharges'),
+    ('cloaked_units', 'iterCloakedUnits'),
+    ('powered_down_components', 'iterPoweredDownComponents'),
+    ('engine_trottles', 'iterUnitEngineTrottles'),
+    ('component_cargo', 'iterUnitComponentCargoBlocks'),
+    ('shields', 'iterUnitShields'),
+    ('component_health', 'iterUnitComponentHealth'),
+    ('active_units', 'iterActiveUnits'),
+    ('health', 'iterUnitHealth'),
+]
+
+# Top level sections in the order they are stored and the SaveReader method reading each
+SAVE_SECTIONS = [
+    ('header', 'readHeader'),
+    ('seconds_eslapsed', 'readDouble'),
+    ('sectors', 'readSectors'),
+    ('factions', 'readFactions'),
+    ('patrol_paths', 'readPatrolPaths'),
+    ('faction_relations', 'readFactionRelations'),
+    ('faction_opinions', 'readFactionOpinions'),
+    ('units', 'readAllUnitData'),
+]
+
+# Unit classes stored with projectile data, every Projectile_ id in GameIDs/Unit.json
+PROJECTILE_IDS = GAME_IDS.category_ids['projectile']
+
+# Record layouts in the order their fields are stored. The read and write
+# functions of each are generated by schema.Layout, consecutive fixed width
+# fields are read and written with a single struct call. extra lists the
+# fields readAllUnitData merges in from the unit side tables.
+SECTOR = Layout('Sector', [
+    ('id', 'i'),
+    ('name', 'string'),
+    ('map_position', 'vector3'),
+    ('resource_name', 'string'),
+    ('description', 'string'),
+    ('gate_distance_multiplier', 'f'),
+    ('random_seed', 'i'),
+    ('position', 'vector3'),
+    ('background_rotation', 'vector3'),
+    ('light_rotation', 'vector3'),
+])
+
+FACTION_AI_SETTINGS = Layout('FactionAiSettings', [
+    ('prefer_single_ship', '?'),
+    ('repair_ships', '?'),
+    ('upgrade_ships', '?'),
+    ('repair_min_hull_damage', 'f'),
+    ('repair_min_credits', 'i'),
+    ('preference_to_place_bounty', 'f'),
+    ('large_ship_preference', 'f'),
+    ('daily_income', 'i'),
+    ('hostile_with_all', '?'),
+    ('min_fleet_unit_count', 'i'),
+    ('max_fleet_unit_count', 'i'),
+    ('offensinve_stance', 'f'),
+    ('allow_other_factions_to_dock', '?'),
+    ('preference_to_build_turrents', 'f'),
+    ('preference_to_build_stations', 'f'),
+    ('ignore_stations_credit_reserve', '?'),
+])
+
+FACTION_STATS = Layout('FactionStats', [
+    ('total_ships_claimed', 'i'),
+    # (unit class, count) pairs
+    ('units_destoryed_by_id', List('2i')),
+    ('units_lost_by_id', List('2i')),
+    ('scratchcards_scratched', 'i'),
+    ('highest_scratchcard_win', 'i'),
+])
+
+FACTION = Layout('Faction', [
+    ('id', 'i'),
+    ('has_generated_name', '?'),
+    If('has_generated_name', [
+        ('generated_name_id', 'i'),
+        ('generated_suffix_id', 'i'),
+    ], [
+        ('has_custom_name', '?'),
+        If('has_custom_name', [
+            ('custom_name', 'string'),
+            ('custom_short_name', 'string'),
+        ]),
+    ]),
+    ('credits', 'i'),
+    ('description', 'string'),
+    ('civilian', '?'),
+    ('type', 'i'),
+    ('aggression', 'f'),
+    ('virtue', 'f'),
+    ('greed', 'f'),
+    ('trade_efficiency', 'f'),
+    ('dynamic_relations', '?'),
+    ('show_job_boards', '?'),
+    ('create_jobs', '?'),
+    ('requisition_point_multiplier', 'f'),
+    ('destory_when_no_units', '?'),
+    ('min_npc_combat_efficiency', 'f'),
+    ('max_npc_combat_efficiency', 'f'),
+    ('additional_rp_provision', 'i'),
+    ('trade_illegal_goods', '?'),
+    ('spawn_time', 'Q'),
+    ('highest_networth', 'i'),
+    ('has_ai_settings', '?'),
+    If('has_ai_settings', [('ai_settings', FACTION_AI_SETTINGS)]),
+    ('has_stats', '?'),
+    If('has_stats', [('stats', FACTION_STATS)]),
+    ('excluded_sectors', List('i')),
+])
+
+PATROL_PATH_NODE = Layout('PatrolPathNode', [
+    ('position', 'vector3'),
+    ('order', 'i'),
+])
+
+PATROL_PATH = Layout('PatrolPath', [
+    ('id', 'i'),
+    ('sector', 'i'),
+    ('loop', '?'),
+    ('nodes', List(PATROL_PATH_NODE)),
+])
+
+# Relations are stored in blocks per faction, the faction id is passed in
+FACTION_RELATION = Layout('FactionRelation', [
+    ('faction', PARAM),
+    ('other_faction', 'i'),
+    ('permanent_peace', '?'),
+    ('restrict_hostility_timeout', '?'),
+    ('neutrality', 'i'),
+    ('hostility_end_time', 'Q'),
+    ('recent_damage_recieved', 'f'),
+])
+
+FACTION_OPINION = Layout('FactionOpinion', [
+    ('faction', 'i'),
+    ('other_faction', 'i'),
+    ('opinion', 'f'),
+])
+
+UNIT_CARGO = Layout('UnitCargo', [
+    ('class', 'i'),
+    ('quantity', 'i'),
+    ('expires', '?'),
+    ('expiry_time', 'Q'),
+], extra=['class_name'])
+
+SHIP_TRADER_ENTRY = Layout('ShipTraderEntry', [
+    ('sell_multiplier', 'f'),
+    ('class', 'i'),
+], extra=['class_name'])
+
+DAMAGE_TYPE = Layout('DamageType', [
+    ('damage', 'f'),
+    ('mining_damage', 'f'),
+    ('sheild_damage_type', 'i'),
+])
+
+PROJECTILE_DATA = Layout('ProjectileData', [
+    ('source_unit', 'i'),
+    ('target_unit', 'i'),
+    ('fire_time', 'Q'),
+    ('remaining_movement', 'f'),
+    ('damage_type', DAMAGE_TYPE),
+])
+
+UNIT = Layout('Unit', [
+    ('id', 'i'),
+    ('class', 'i'),
+    ('sector', 'i'),
+    ('position', 'vector3'),
+    ('rotation', 'vector4'),
+    ('faction', 'i'),
+    ('rp_provision', 'i'),
+    ('is_cargo', '?'),
+    If('is_cargo', [('cargo_data', UNIT_CARGO)]),
+    ('is_debris', '?'),
+    # Unused, this should never happen
+    If('is_debris', [Invalid('Invalid Data')]),
+    ('is_ship_trader', '?'),
+    If('is_ship_trader', [('ship_trader_data', List(SHIP_TRADER_ENTRY))]),
+    If(In('class', PROJECTILE_IDS), [('projectile_data', PROJECTILE_DATA)]),
+], extra=['name', 'component_data', 'health', 'class_name'])
+
+UNIT_NAME = Layout('UnitName', [
+    ('unit_id', 'i'),
+    ('name', 'string'),
+])
+
+UNIT_FACTORY = Layout('UnitFactory', [
+    ('state', 'i'),
+    ('progress', 'f'),
+])
+
+UNIT_COMPONENT_DATA = Layout('UnitComponentData', [
+    ('unit_id', 'i'),
+    ('ship_name_index', 'i'),
+    If(Equals('ship_name_index', -1), [('custom_ship_name', 'string')]),
+    ('cargo_capacity', 'f'),
+    ('has_factory', '?'),
+    If('has_factory', [('factories', List(UNIT_FACTORY))]),
+    ('under_construction', '?'),
+    ('construction_progress', 'f'),
+    ('station_class_number', 'i'),
+], extra=[
+    'modded', 'offline', 'cargo', 'capacitor_charge', 'cloaked', 'trottle',
+    'shield_data', 'component_health', 'active_data',
+])
+
+MODDED_COMPONENT = Layout('ModdedComponent', [
+    ('unit_id', 'i'),
+    ('bay_id', 'i'),
+    ('component', 'i'),
+])
+
+CAPACITOR_CHARGE = Layout('CapacitorCharge', [
+    ('unit_id', 'i'),
+    ('capacitor_charge', 'f'),
+])
+
+POWERED_DOWN_COMPONENT = Layout('PoweredDownComponent', [
+    ('unit_id', 'i'),
+    ('bay_id', 'i'),
+])
+
+ENGINE_TROTTLE = Layout('EngineTrottle', [
+    ('unit_id', 'i'),
+    ('trottle', 'f'),
+])
+
+COMPONENT_CARGO_ITEM = Layout('ComponentCargoItem', [
+    ('class', 'i'),
+    ('quantity', 'i'),
+], extra=['class_name'])
+
+# Cargo flattened out of its block, the unit id is passed in
+COMPONENT_CARGO = Layout('ComponentCargo', [
+    ('unit_id', PARAM),
+    ('class', 'i'),
+    ('quantity', 'i'),
+], extra=['class_name'])
+
+COMPONENT_CARGO_BLOCK = Layout('ComponentCargoBlock', [
+    ('unit_id', 'i'),
+    ('cargo', List(COMPONENT_CARGO_ITEM)),
+])
+
+SHIELD_POINT = Layout('ShieldPoint', [
+    ('index', 'B'),
+    ('health', 'f'),
+])
+
+SHIELD = Layout('Shield', [
+    ('unit_id', 'i'),
+    ('data', List(SHIELD_POINT, count='B')),
+])
+
+COMPONENT_HEALTH_ITEM = Layout('ComponentHealthItem', [
+    ('bay_id', 'i'),
+    ('health', 'f'),
+])
+
+COMPONENT_HEALTH = Layout('ComponentHealth', [
+    ('unit_id', 'i'),
+    ('component_health', List(COMPONENT_HEALTH_ITEM)),
+])
+
+ACTIVE_DATA = Layout('ActiveData', [
+    ('velocity', 'vector3'),
+    ('currentTurn', 'f'),
+])
+
+ACTIVE_UNIT = Layout('ActiveUnit', [
+    ('unit_id', 'i'),
+    ('active_data', ACTIVE_DATA),
+])
+
+UNIT_HEALTH = Layout('UnitHealth', [
+    ('unit_id', 'i'),
+    ('destoryed', '?'),
+    ('total_damage_recieved', 'f'),
+    ('health', 'f'),
+])
+
+# Layout of the records of the UNIT_SECTIONS tables that start with unit_id
+UNIT_TABLE_LAYOUTS = {
+    'names': UNIT_NAME,
+    'component_data': UNIT_COMPONENT_DATA,
+    'modded_components': MODDED_COMPONENT,
+    'capacitor_charges': CAPACITOR_CHARGE,
+    'powered_down_components': POWERED_DOWN_COMPONENT,
+    'engine_trottles': ENGINE_TROTTLE,
+    'component_cargo': COMPONENT_CARGO_BLOCK,
+    'shields': SHIELD,
+    'component_health': COMPONENT_HEALTH,
+    'active_units': ACTIVE_UNIT,
+    'health': UNIT_HEALTH,
+}
+
+
+def encode7BitInt(number) -> bytes:
+    if number < 0:
+        raise Exception('7 bit int cannot be negative')
+    # The most read7BitInt decodes from its 5 bytes
+    if number > 0xFFFFFFFF:
+        raise Exception('7 bit int is longer than 5 bytes')
+    encoded = bytearray()
+    while number >= 0x80:
+        encoded.append((number & 0x7F) | 0x80)
+        number >>= 7
+    encoded.append(number)
+    return bytes(encoded)
 
 
 class Reader:
     def __init__(self, data):
         self.data = data
         self.position = 0
+        self._mapped = None
+
+    @classmethod
+    def fromPath(cls, path):
+        # Maps the file read only so fields are unpacked straight from the page cache
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        reader = cls(memoryview(mapped))
+        reader._mapped = mapped
+        return reader
+
+    def close(self):
+        if self._mapped is not None:
+            self.data.release()
+            self._mapped.close()
+            self._mapped = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def readStruct(self, layout: struct.Struct) -> tuple:
+        values = layout.unpack_from(self.data, self.position)
+        self.position += layout.size
+        return values
 
     def readVector3(self) -> tuple:
-        return (self.readSingle(), self.readSingle(), self.readSingle())
+        values = _VECTOR3.unpack_from(self.data, self.position)
+        self.position += 12
+        return values
 
     def readVector4(self) -> tuple:
-        return (self.readSingle(), self.readSingle(), self.readSingle(), self.readSingle())
+        values = _VECTOR4.unpack_from(self.data, self.position)
+        self.position += 16
+        return values
 
     def readSingle(self) -> int:
-        raw = self.data[self.position:self.position+4]
+        value = _SINGLE.unpack_from(self.data, self.position)[0]
         self.position += 4
-        return struct.unpack('f', raw)[0]
+        return value
 
     def readInt32(self) -> int:
-        raw = self.data[self.position:self.position+4]
+        value = _INT32.unpack_from(self.data, self.position)[0]
         self.position += 4
-        return int.from_bytes(raw, 'little', signed=True)
+        return value
 
     def readDouble(self) -> int:
-        raw = self.data[self.position:self.position+8]
+        value = _DOUBLE.unpack_from(self.data, self.position)[0]
         self.position += 8
-        return int.from_bytes(raw, 'little')
+        return value
 
     def readBoolean(self) -> bool:
-        raw = self.data[self.position:self.position+1]
+        value = _BOOLEAN.unpack_from(self.data, self.position)[0]
         self.position += 1
-        return True if raw != b'\x00' else False
+        return value
 
     def read7BitInt(self) -> int:
-        byte_list = []
-        while len(byte_list) <= 5:
-            byte = self.data[self.position:self.position+1]
-            byte_list.insert(0, '{:08b}'.format(int(byte.hex(), 16)))
-            self.position += 1
-            if byte_list[0][0] == '0':
-                break
-
-        binary_number = ''
-        for count, byte in enumerate(byte_list):
-            byte = byte[1:]
-            if count == 0:
-                byte = byte.lstrip('0')
-            binary_number += byte
-
-        if binary_number != '':
-            number = int(binary_number, 2)
-        else:
-            number = 0
-        return number
-        
+        data = self.data
+        position = self.position
+        if position >= len(data):
+            raise Exception('Unexpected end of data in 7 bit int')
+        byte = data[position]
+        if byte < 0x80:
+            self.position = position + 1
+            return byte
+
+        number = byte & 0x7F
+        for shift in (7, 14, 21, 28):
+            position += 1
+            if position >= len(data):
+                raise Exception('Unexpected end of data in 7 bit int')
+            byte = data[position]
+            number |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                self.position = position + 1
+                return number
+        raise Exception('7 bit int is longer than 5 bytes')
+
     def readString(self) -> str:
         lenght = self.read7BitInt()
-        string = self.data[self.position:self.position+lenght]
-        string = string.decode()
+        string = str(self.data[self.position:self.position+lenght], 'utf-8')
         self.position += lenght
         return string
 
     def readByte(self) -> int:
-        raw = self.data[self.position:self.position+1]
+        value = _BYTE.unpack_from(self.data, self.position)[0]
         self.position += 1
-        return int.from_bytes(raw, 'little')
+        return value
 
 class SaveReader(Reader):
     def __init__(self, data):
@@ -88,478 +448,600 @@ class SaveReader(Reader):
         return header
 
     def _readSector(self) -> dict:
-        sector = {}
-        sector['id'] = self.readInt32()
-        sector['name'] = self.readString()
-        sector['map_position'] = self.readVector3()
-        sector['resource_name'] = self.readString()
-        sector['description'] = self.readString()
-        sector['gate_distance_multiplier'] = self.readSingle()
-        sector['random_seed'] = self.readInt32()
-        sector['position'] = self.readVector3()
-        sector['background_rotation'] = self.readVector3()
-        sector['light_rotation'] = self.readVector3()
-        return sector
+        return SECTOR.read(self)
 
-    def readSectors(self) -> list:
-        sectors = []
+    # The iter methods yield records as they are decoded. Each one must be
+    # exhausted before reading the next section, as they share the read position.
+    def iterSectors(self):
         count = self.readInt32()
         for _ in range(count):
-            sectors.append(self._readSector())
-    
-    def _readFactionAiSettings(self) -> dict:
-        settings = {}
-        settings['prefer_single_ship'] = self.readBoolean()
-        settings['repair_ships'] = self.readBoolean()
-        settings['upgrade_ships'] = self.readBoolean()
-        settings['repair_min_hull_damage'] = self.readSingle()
-        settings['repair_min_credits'] = self.readInt32()
-        settings['preference_to_place_bounty'] = self.readSingle()
-        settings['large_ship_preference'] = self.readSingle()
-        settings['daily_income'] = self.readInt32()
-        settings['hostile_with_all'] = self.readBoolean()
-        settings['min_fleet_unit_count'] = self.readInt32()
-        settings['max_fleet_unit_count'] = self.readInt32()
-        settings['offensinve_stance'] = self.readSingle()
-        settings['allow_other_factions_to_dock'] = self.readBoolean()
-        settings['preference_to_build_turrents'] = self.readSingle()
-        settings['preference_to_build_stations'] = self.readSingle()
-        settings['ignore_stations_credit_reserve'] = self.readBoolean()
-        return settings
-
-    def _readFactionStatsUnitCounts(self) -> list:
-        count = self.readInt32()
-        items = []
-        for _ in range(count):
-            items.append((self.readInt32(), self.readInt32()))
-        return items
+            yield self._readSector()
 
-    def _readFactionStats(self) -> dict:
-        stats = {}
-        stats['total_ships_claimed'] = self.readInt32()
-        stats['units_destoryed_by_id'] = self._readFactionStatsUnitCounts()
-        stats['units_lost_by_id'] = self._readFactionStatsUnitCounts()
-        stats['scratchcards_scratched'] = self.readInt32()
-        stats['highest_scratchcard_win'] = self.readInt32()
+    def readSectors(self) -> list:
+        return list(self.iterSectors())
 
     def _readFaction(self) -> dict:
-        faction = {}
-        faction['id'] = self.readInt32()
+        return FACTION.read(self)
 
-        faction['has_generated_name'] = self.readBoolean()
-        if faction['has_generated_name']:
-            faction['generated_name_id'] = self.readInt32()
-            faction['generated_suffix_id'] = self.readInt32()
-        else:
-            faction['has_custom_name'] = self.readBoolean()
-            if faction['has_custom_name']:
-                faction['custom_name'] = self.readString()
-                faction['custom_short_name'] = self.readString()
-        
-        faction['credits'] = self.readInt32()
-        faction['description'] = self.readString()
-        faction['civilian'] = self.readBoolean()
-        faction['type'] = self.readInt32()
-        faction['aggression'] = self.readSingle()
-        faction['virtue'] = self.readSingle()
-        faction['greed'] = self.readSingle()
-        faction['trade_efficiency'] = self.readSingle()
-        faction['dynamic_relations'] = self.readBoolean()
-        faction['show_job_boards'] = self.readBoolean()
-        faction['create_jobs'] = self.readBoolean()
-        faction['requisition_point_multiplier'] = self.readSingle()
-        faction['destory_when_no_units'] = self.readBoolean()
-        faction['min_npc_combat_efficiency'] = self.readSingle()
-        faction['max_npc_combat_efficiency'] = self.readSingle()
-        faction['additional_rp_provision'] = self.readInt32()
-        faction['trade_illegal_goods'] = self.readBoolean()
-        faction['spawn_time'] = self.readDouble()
-        faction['highest_networth'] = self.readInt32()
-
-        faction['has_ai_settings'] = self.readBoolean()
-        if faction['has_ai_settings']:
-            faction['ai_settings'] = self._readFactionAiSettings()
-
-        faction['has_stats'] = self.readBoolean()
-        if faction['has_stats']:
-            faction['stats'] = self._readFactionStats()
-
-        faction['excluded_sectors'] = []
-        excluded_sector_count = self.readInt32()
-        for _ in range(excluded_sector_count):
-            faction['excluded_sectors'].append(self.readInt32())
-        return faction
-
-    def readFactions(self) -> list:
-        factions = []
+    def iterFactions(self):
         count = self.readInt32()
         for _ in range(count):
-            factions.append(self._readFaction())
-        return factions
+            yield self._readFaction()
 
-    def _readPatrolPathNode(self) -> dict:
-        node = {}
-        node['position'] = self.readVector3()
-        node['order'] = self.readInt32()
-        return node
+    def readFactions(self) -> list:
+        return list(self.iterFactions())
 
     def _readPatrolPath(self) -> dict:
-        path = {}
-        path['id'] = self.readInt32()
-        path['sector'] = self.readInt32()
-        path['loop'] = self.readBoolean()
-        path['nodes'] = []
+        return PATROL_PATH.read(self)
 
-        node_count = self.readInt32()
-        for _ in range(node_count):
-            path['nodes'].append(self._readPatrolPathNode())
-        return path
-
-    def readPatrolPaths(self) -> list:
-        paths = []
+    def iterPatrolPaths(self):
         count = self.readInt32()
         for _ in range(count):
-            paths.append(self._readPatrolPath())
-        return paths
+            yield self._readPatrolPath()
+
+    def readPatrolPaths(self) -> list:
+        return list(self.iterPatrolPaths())
 
     def _readFactionRelation(self, faction_id) -> dict:
-        relation = {}
-        relation['faction'] = faction_id
-        relation['other_faction'] = self.readInt32()
-        relation['permanent_peace'] = self.readBoolean()
-        relation['restrict_hostility_timeout'] = self.readBoolean()
-        relation['neutrality'] = self.readInt32()
-        relation['hostility_end_time'] = self.readDouble()
-        relation['recent_damage_recieved'] = self.readSingle()
-        return relation
+        return FACTION_RELATION.read(self, faction_id)
     
-    def readFactionRelations(self) -> list:
-        relations = []
+    def iterFactionRelations(self):
         count = self.readInt32()
         for _ in range(count):
             faction_id = self.readInt32()
             count = self.readInt32()
             for _ in range(count):
-                relations.append(self._readFactionRelation(faction_id))
-        return relations
+                yield self._readFactionRelation(faction_id)
+
+    def readFactionRelations(self) -> list:
+        return list(self.iterFactionRelations())
+
+    def iterFactionRelationBlocks(self):
+        # Relations as stored, one block per faction including factions without any
+        count = self.readInt32()
+        for _ in range(count):
+            block = {}
+            block['faction'] = self.readInt32()
+            block['relations'] = []
+            count = self.readInt32()
+            for _ in range(count):
+                block['relations'].append(self._readFactionRelation(block['faction']))
+            yield block
+
+    def readFactionRelationBlocks(self) -> list:
+        return list(self.iterFactionRelationBlocks())
     
     def _readFactionOpinion(self) -> dict:
-        opinion = {}
-        opinion['faction'] = self.readInt32()
-        opinion['other_faction'] = self.readInt32()
-        opinion['opinion'] = self.readSingle()
-        return opinion
+        return FACTION_OPINION.read(self)
 
-    def readFactionOpinions(self) -> list:
-        opinions = []
+    def iterFactionOpinions(self):
         count = self.readInt32()
         for _ in range(count):
-            opinions.append(self._readFactionOpinion())
-        return opinions
-
-    def _readUnitCargo(self):
-        cargo = {}
-        cargo['class'] = self.readInt32()
-        cargo['quantity'] = self.readInt32()
-        cargo['expires'] = self.readBoolean()
-        cargo['expiry_time'] = self.readDouble()
-        return cargo
-
-    def _readShipTrader(self):
-        ships = []
+            yield self._readFactionOpinion()
+
+    def readFactionOpinions(self) -> list:
+        return list(self.iterFactionOpinions())
+
+    def _readUnitCargo(self) -> dict:
+        return UNIT_CARGO.read(self)
+
+    def _readShipTrader(self) -> list:
+        count = self.readInt32()
+        read = SHIP_TRADER_ENTRY.read
+        return [read(self) for _ in range(count)]
+
+    def _readProjectileData(self) -> dict:
+        return PROJECTILE_DATA.read(self)
+
+    def _readUnit(self) -> dict:
+        return UNIT.read(self)
+
+    def iterUnits(self):
         count = self.readInt32()
         for _ in range(count):
-            ship = {}
-            ship['sell_multiplier'] = self.readSingle()
-            ship['class'] = self.readInt32()
-            ships.append(ship)
-        return ships
-
-    def _readDamageType(self):
-        damage = {}
-        damage['damage'] = self.readSingle()
-        damage['mining_damage'] = self.readSingle()
-        damage['sheild_damage_type'] = self.readInt32()
-        return damage
-
-    def _readProjectileData(self):
-        projectile = {}
-        projectile['source_unit'] = self.readInt32()
-        projectile['target_unit'] = self.readInt32()
-        projectile['fire_time'] = self.readDouble()
-        projectile['remaining_movement'] = self.readSingle()
-        projectile['damage_type'] = self._readDamageType()
-        return projectile
-
-    def _readUnit(self):
-        unit = {}
-        unit['id'] = self.readInt32()
-        unit['class'] = self.readInt32()
-        unit['sector'] = self.readInt32()
-        unit['position'] = self.readVector3()
-        unit['rotation'] = self.readVector4()
-        unit['faction'] = self.readInt32()
-        unit['rp_provision'] = self.readInt32()
-
-        unit['is_cargo'] = self.readBoolean()
-        if unit['is_cargo']:
-            self._readUnitCargo()
-
-        unit['is_debris'] = self.readBoolean()
-        if unit['is_debris']:
-            # Unused, this should never happen
-            raise Exception('Invalid Data')
-        
-        unit['is_ship_trader'] = self.readBoolean()
-        if unit['is_ship_trader']:
-            unit['ship_trader_data'] = self._readShipTrader()
-
-        projectile_ids = [30100, 30200, 30300, 30400, 29100, 30600, 29350, 30800, 30820, 30840, 30860, 30880, 30900, 30920, 30940, ]
-        if unit['class'] in projectile_ids:
-            unit['projectile_data'] = self._readProjectileData()
-        
-        return unit
+            yield self._readUnit()
 
     def _readUnits(self) -> list:
-        units = []
+        return list(self.iterUnits())
+
+    def _readRecord(self, layout, *params):
+        return layout.read(self, *params)
+
+    def _iterRecords(self, layout):
         count = self.readInt32()
+        read = layout.read
         for _ in range(count):
-            units.append(self._readUnit())
-        return units
+            yield read(self)
+
+    def iterUnitNames(self):
+        return self._iterRecords(UNIT_NAME)
 
     def _readUnitNames(self) -> list:
-        units = []
-        count = self.readInt32()
-        for _ in range(count):
-            unit = {}
-            unit['unit_id'] = self.readInt32()
-            unit['name'] = self.readString()
-            units.append(unit)
-        return units
-
-    def _readUnitFactoryData(self) -> list:
-        data = []
-        count = self.readInt32()
-        for _ in range(count):
-            factory = {}
-            factory['state'] = self.readInt32()
-            factory['progress'] = self.readSingle()
-            data.append(factory)
-        return data
-
-    def _readUnitComponentData(self) -> dict:
-        component_data = {}
-        component_data['unit_id'] = self.readInt32()
-        component_data['ship_name_index'] = self.readInt32()
-        if component_data['ship_name_index'] == -1:
-            component_data['custom_ship_name'] = self.readString()
-        
-        component_data['cargo_capacity'] = self.readSingle()
-        
-        component_data['has_factory'] = self.readBoolean()
-        if component_data['has_factory']:
-            component_data['factories'] = self._readUnitFactoryData()
-
-        component_data['under_construction'] = self.readBoolean()
-        component_data['construction_progress'] = self.readSingle()
-        component_data['station_class_number'] = self.readInt32()
-        return component_data
-    
-    def _readAllUnitComponentData(self) -> dict:
-        all_component_data = []
-        count = self.readInt32()
-        for _ in range(count):
-            all_component_data.append(self._readUnitComponentData())
-        return all_component_data
+        return list(self.iterUnitNames())
 
-    def _readModdedComponents(self) -> dict:
-        modded_components = []
-        count = self.readInt32()
-        for _ in range(count):
-            component = {}
-            component['unit_id'] = self.readInt32()
-            component['bay_id'] = self.readInt32()
-            component['component'] = self.readInt32()
-            modded_components.append(component)
-        return modded_components
+    def iterUnitComponentData(self):
+        return self._iterRecords(UNIT_COMPONENT_DATA)
+
+    def _readAllUnitComponentData(self) -> list:
+        return list(self.iterUnitComponentData())
+
+    def iterModdedComponents(self):
+        return self._iterRecords(MODDED_COMPONENT)
+
+    def _readModdedComponents(self) -> list:
+        return list(self.iterModdedComponents())
+
+    def iterCapacitorCharges(self):
+        return self._iterRecords(CAPACITOR_CHARGE)
 
     def _readCapacitorCharges(self) -> list:
-        charges = []
+        return list(self.iterCapacitorCharges())
+
+    def iterCloakedUnits(self):
         count = self.readInt32()
         for _ in range(count):
-            charge = {}
-            charge['unit_id'] = self.readInt32()
-            charge['capacitor_charge'] = self.readSingle()
-            charges.append(charge)
-        return charges
+            yield self.readInt32()
 
     def _readCloakedUnits(self) -> list:
-        units = []
-        count = self.readInt32()
-        for _ in range(count):
-            units.append(self.readInt32())
-        return units
+        return list(self.iterCloakedUnits())
+
+    def iterPoweredDownComponents(self):
+        return self._iterRecords(POWERED_DOWN_COMPONENT)
 
     def _readPoweredDownComponents(self) -> list:
-        components = []
-        count = self.readInt32()
-        for _ in range(count):
-            component = {}
-            component['unit_id'] = self.readInt32()
-            component['bay_id'] = self.readInt32()
-            components.append(component)
-        return components
+        return list(self.iterPoweredDownComponents())
+
+    def iterUnitEngineTrottles(self):
+        return self._iterRecords(ENGINE_TROTTLE)
 
     def _readUnitEngineTrottles(self) -> list:
-        trottles = []
-        count = self.readInt32()
-        for _ in range(count):
-            trottle = {}
-            trottle['unit_id'] = self.readInt32()
-            trottle['trottle'] = self.readSingle()
-            trottles.append(trottle)
-        return trottles
+        return list(self.iterUnitEngineTrottles())
 
-    def _readUnitComponentCargo(self) -> list:
-        cargos = []
+    def iterUnitComponentCargo(self):
         count = self.readInt32()
+        read = COMPONENT_CARGO.read
         for _ in range(count):
             unit_id = self.readInt32()
             count = self.readInt32()
             for _ in range(count):
-                cargo = {}
-                cargo['unit_id'] = unit_id
-                cargo['class'] = self.readInt32()
-                cargo['quantity'] = self.readInt32()
-                cargos.append(cargo)
-        return cargos
+                yield read(self, unit_id)
+
+    def _readUnitComponentCargo(self) -> list:
+        return list(self.iterUnitComponentCargo())
+
+    def iterUnitComponentCargoBlocks(self):
+        # Cargo as stored, one block per unit
+        return self._iterRecords(COMPONENT_CARGO_BLOCK)
+
+    def iterUnitShields(self):
+        return self._iterRecords(SHIELD)
 
     def _readUnitShields(self) -> list:
-        shields = []
-        count = self.readInt32()
-        for _ in range(count):
-            shield = {}
-            shield['unit_id'] = self.readInt32()
-            shield['data'] = []
-            count = self.readByte()
-            for _ in range(count):
-                sheild_point = {}
-                sheild_point['index'] = self.readByte()
-                sheild_point['health'] = self.readSingle()
-                shield['data'].append(sheild_point)
-            shields.append(shield)
-        return shields
+        return list(self.iterUnitShields())
+
+    def iterUnitComponentHealth(self):
+        return self._iterRecords(COMPONENT_HEALTH)
 
     def _readUnitComponentHealth(self) -> list:
-        healths = []
-        count = self.readInt32()
-        for _ in range(count):
-            health = {}
-            health['unit_id'] = self.readInt32()
-            health['component_health'] = []
-            count = self.readInt32()
-            for _ in range(count):
-                compontent = {}
-                compontent['bay_id'] = self.readInt32()
-                compontent['health'] = self.readSingle()
-                health['component_health'].append(compontent)
-            healths.append(health)
-        return healths
+        return list(self.iterUnitComponentHealth())
+
+    def iterActiveUnits(self):
+        return self._iterRecords(ACTIVE_UNIT)
 
     def _readActiveUnits(self) -> list:
-        units = []
-        count = self.readInt32()
-        for _ in range(count):
-            unit = {}
-            unit['unit_id'] = self.readInt32()
-            unit['active_data'] = {}
-            unit['active_data']['velocity'] = self.readVector3(),
-            unit['active_data']['currentTurn'] = self.readSingle()
-            units.append(unit)
-        return units
+        return list(self.iterActiveUnits())
+
+    def iterUnitHealth(self):
+        return self._iterRecords(UNIT_HEALTH)
 
     def _readUnitHealth(self) -> list:
-        units = []
-        count = self.readInt32()
-        for _ in range(count):
-            health = {}
-            health['unit_id'] = self.readInt32()
-            health['destoryed'] = self.readBoolean()
-            health['total_damage_recieved'] = self.readSingle()
-            health['health'] = self.readSingle()
-            units.append(health)
-        return units
+        return list(self.iterUnitHealth())
 
     def readAllUnitData(self) -> list:
         units = self._readUnits()
-        
-        for name in self._readUnitNames():
-            for unit in units:
-                if unit['id'] == name['unit_id']:
-                    unit['name'] = name['name']
-        
-        for component in self._readAllUnitComponentData():
-            for unit in units:
-                if unit['id'] == component['unit_id']:
-                    unit['component_data'] = component.copy()
-                    del unit['component_data']['unit_id']
-                    unit['component_data']['modded'] = []
-                    unit['component_data']['offline'] = []
-                    unit['component_data']['cargo'] = []
-
-        for component in self._readModdedComponents():
-            for unit in units:
-                if unit['id'] == component['unit_id']:
-                    base_component = component.copy()
-                    del base_component['unit_id']
-                    unit['component_data']['modded'].append(base_component)
-
-        for capacitor in self._readCapacitorCharges():
-            for unit in units:
-                if unit['id'] == capacitor['unit_id']:
-                    unit['component_data']['capacitor_charge'] = capacitor['capacitor_charge']
-
-        for unit_id in self._readCloakedUnits():
-            for unit in units:
-                if unit['id'] == unit_id:
-                    unit['component_data']['cloaked'] = True
-        
-        for component in self._readPoweredDownComponents():
-            for unit in units:
-                if unit['id'] == component['unit_id']:
-                    unit['component_data']['offline'].append(component['bay_id'])
-
-        for trottle in self._readUnitEngineTrottles():
-            for unit in units:
-                if unit['id'] == trottle['unit_id']:
-                    unit['component_data']['trottle'] = trottle['trottle']
-
-        for cargo in self._readUnitComponentCargo():
-            for unit in units:
-                if unit['id'] == cargo['unit_id']:
-                    base_cargo = cargo.copy()
-                    del base_cargo['unit_id']
-                    unit['component_data']['cargo'].append(base_cargo)
-
-        for shield in self._readUnitShields():
-            for unit in units:
-                if unit['id'] == shield['unit_id']:
-                    unit['component_data']['shield_data'] = shield['data']
-
-        for component in self._readUnitComponentHealth():
-            for unit in units:
-                if unit['id'] == component['unit_id']:
-                    unit['component_data']['component_health'] = component['component_health']
-
-        for active_unit in self._readActiveUnits():
-            for unit in units:
-                if unit['id'] == active_unit['unit_id']:
-                    unit['component_data']['active_data'] = active_unit['active_data']
-
-        for health_data in self._readUnitHealth():
-            for unit in units:
-                if unit['id'] == health_data['unit_id']:
-                    health = health_data.copy()
-                    del health['unit_id']
-                    unit['health'] = health
-        return units
+        # Generators read nothing until mergeUnitData reaches them, in stored order
+        tables = {name: getattr(self, method)() for name, method in UNIT_SECTIONS[1:]}
+        tables['component_cargo'] = self.iterUnitComponentCargo()
+        return mergeUnitData(units, tables)
+
+    def iterAllUnitData(self):
+        # The units of readAllUnitData one at a time, so they do not all have to be held
+        # in memory. The unit section is read once to find where each record starts, then
+        # every unit is decoded again with its side records, so this takes about twice
+        # as long as readAllUnitData.
+        unit_positions = []
+        count = self.readInt32()
+        for _ in range(count):
+            unit_positions.append(self.position)
+            UNIT.read(self)
+
+        # Start of the records of each unit, by table and unit id
+        positions = {}
+        for name, _ in UNIT_SECTIONS[1:]:
+            table = positions[name] = {}
+            count = self.readInt32()
+            for _ in range(count):
+                start = self.position
+                if name == 'cloaked_units':
+                    unit_id = self.readInt32()
+                else:
+                    unit_id = UNIT_TABLE_LAYOUTS[name].read(self)['unit_id']
+                table.setdefault(unit_id, []).append(start)
+        end = self.position
+
+        for unit_position in unit_positions:
+            self.position = unit_position
+            unit = self._readUnit()
+            tables = {}
+            for name, table in positions.items():
+                records = tables[name] = []
+                for start in table.get(unit['id'], ()):
+                    self.position = start
+                    if name == 'cloaked_units':
+                        records.append(self.readInt32())
+                    elif name == 'component_cargo':
+                        # Flattened as iterUnitComponentCargo yields it
+                        unit_id = self.readInt32()
+                        count = self.readInt32()
+                        for _ in range(count):
+                            records.append(self._readRecord(COMPONENT_CARGO, unit_id))
+                    else:
+                        records.append(self._readRecord(UNIT_TABLE_LAYOUTS[name]))
+            mergeUnitData([unit], tables)
+            yield unit
+        self.position = end
+
+    def readUnitSections(self) -> dict:
+        # The unit block as stored, without merging the side tables into the units
+        sections = {}
+        for name, method in UNIT_SECTIONS:
+            sections[name] = list(getattr(self, method)())
+        return sections
+
+    def readRemaining(self) -> bytes:
+        # Everything after the last section that is decoded so far
+        remaining = bytes(self.data[self.position:])
+        self.position = len(self.data)
+        return remaining
+
+    def readSave(self, raw=False) -> dict:
+        # raw keeps relations and the unit block in their stored layout so
+        # SaveWriter.writeSave(save, raw=True) reproduces the file exactly
+        save = {}
+        for name, method in SAVE_SECTIONS:
+            if raw and name == 'faction_relations':
+                save[name] = self.readFactionRelationBlocks()
+            elif raw and name == 'units':
+                save[name] = self.readUnitSections()
+            else:
+                save[name] = getattr(self, method)()
+        return save
+
+
+class Writer:
+    def __init__(self, capacity=1 << 16):
+        # Written into one preallocated buffer that doubles when it runs out of space
+        self.data = bytearray(capacity)
+        self.position = 0
+
+    def _reserve(self, size):
+        needed = self.position + size
+        if needed > len(self.data):
+            self.data.extend(bytes(max(needed, 2 * len(self.data)) - len(self.data)))
+
+    def getValue(self) -> bytes:
+        return bytes(self.data[:self.position])
+
+    def writeStruct(self, layout: struct.Struct, *values):
+        self._reserve(layout.size)
+        layout.pack_into(self.data, self.position, *values)
+        self.position += layout.size
+
+    def writeVector3(self, value):
+        self.writeStruct(_VECTOR3, *value)
+
+    def writeVector4(self, value):
+        self.writeStruct(_VECTOR4, *value)
+
+    def writeSingle(self, value):
+        self.writeStruct(_SINGLE, value)
+
+    def writeInt32(self, value):
+        self.writeStruct(_INT32, value)
+
+    def writeDouble(self, value):
+        self.writeStruct(_DOUBLE, value)
+
+    def writeBoolean(self, value):
+        self.writeStruct(_BOOLEAN, value)
+
+    def writeBytes(self, value):
+        self._reserve(len(value))
+        self.data[self.position:self.position+len(value)] = value
+        self.position += len(value)
+
+    def write7BitInt(self, value):
+        self.writeBytes(encode7BitInt(value))
+
+    def writeString(self, value):
+        encoded = value.encode()
+        self.write7BitInt(len(encoded))
+        self.writeBytes(encoded)
+
+    def writeByte(self, value):
+        self.writeStruct(_BYTE, value)
+
+
+class SaveWriter(Writer):
+    def __init__(self, capacity=1 << 16):
+        super().__init__(capacity)
+
+    def writeHeader(self, header):
+        for number in header['version'].split('.'):
+            self.writeInt32(int(number))
+        self.writeBoolean(header['autosave'])
+        self.writeString(header['timestamp'])
+        self.writeInt32(header['scenario_info_id'])
+        self.writeInt32(header['global_save_number'])
+        self.writeInt32(header['save_number'])
+        self.writeBoolean(header['has_player'])
+
+        if header['has_player']:
+            self.writeString(header['player_sector_name'])
+            self.writeString(header['player_name'])
+            self.writeInt32(header['credits'])
+
+    def _writeSector(self, sector):
+        SECTOR.write(self, sector)
+
+    def writeSectors(self, sectors):
+        self.writeInt32(len(sectors))
+        for sector in sectors:
+            self._writeSector(sector)
+
+    def _writeFaction(self, faction):
+        FACTION.write(self, faction)
+
+    def writeFactions(self, factions):
+        self.writeInt32(len(factions))
+        for faction in factions:
+            self._writeFaction(faction)
+
+    def _writePatrolPath(self, path):
+        PATROL_PATH.write(self, path)
+
+    def writePatrolPaths(self, paths):
+        self.writeInt32(len(paths))
+        for path in paths:
+            self._writePatrolPath(path)
+
+    def _writeRecords(self, layout, records):
+        self.writeInt32(len(records))
+        write = layout.write
+        for record in records:
+            write(self, record)
+
+    def writeFactionRelations(self, relations):
+        # Blocks are rebuilt from runs of the same faction id, factions without
+        # relations are lost. Use writeFactionRelationBlocks for exact output.
+        blocks = []
+        for faction_id, block in _groupRuns(relations, 'faction'):
+            blocks.append({'faction': faction_id, 'relations': block})
+        self.writeFactionRelationBlocks(blocks)
+
+    def writeFactionRelationBlocks(self, blocks):
+        self.writeInt32(len(blocks))
+        for block in blocks:
+            self.writeInt32(block['faction'])
+            self._writeRecords(FACTION_RELATION, block['relations'])
+
+    def writeFactionOpinions(self, opinions):
+        self._writeRecords(FACTION_OPINION, opinions)
+
+    def _writeUnit(self, unit):
+        UNIT.write(self, unit)
+
+    def _writeUnits(self, units):
+        self.writeInt32(len(units))
+        for unit in units:
+            self._writeUnit(unit)
+
+    def _writeUnitNames(self, names):
+        self._writeRecords(UNIT_NAME, names)
+
+    def _writeAllUnitComponentData(self, all_component_data):
+        self._writeRecords(UNIT_COMPONENT_DATA, all_component_data)
+
+    def _writeModdedComponents(self, modded_components):
+        self._writeRecords(MODDED_COMPONENT, modded_components)
+
+    def _writeCapacitorCharges(self, charges):
+        self._writeRecords(CAPACITOR_CHARGE, charges)
+
+    def _writeCloakedUnits(self, unit_ids):
+        self.writeInt32(len(unit_ids))
+        for unit_id in unit_ids:
+            self.writeInt32(unit_id)
+
+    def _writePoweredDownComponents(self, components):
+        self._writeRecords(POWERED_DOWN_COMPONENT, components)
+
+    def _writeUnitEngineTrottles(self, trottles):
+        self._writeRecords(ENGINE_TROTTLE, trottles)
+
+    def _writeUnitComponentCargo(self, cargos):
+        blocks = []
+        for unit_id, block in _groupRuns(cargos, 'unit_id'):
+            blocks.append({'unit_id': unit_id, 'cargo': block})
+        self._writeUnitComponentCargoBlocks(blocks)
+
+    def _writeUnitComponentCargoBlocks(self, blocks):
+        self._writeRecords(COMPONENT_CARGO_BLOCK, blocks)
+
+    def _writeUnitShields(self, shields):
+        self._writeRecords(SHIELD, shields)
+
+    def _writeUnitComponentHealth(self, healths):
+        self._writeRecords(COMPONENT_HEALTH, healths)
+
+    def _writeActiveUnits(self, units):
+        self._writeRecords(ACTIVE_UNIT, units)
+
+    def _writeUnitHealth(self, units):
+        self._writeRecords(UNIT_HEALTH, units)
+
+    def writeUnitSections(self, sections):
+        self._writeUnits(sections['units'])
+        self._writeUnitNames(sections['names'])
+        self._writeAllUnitComponentData(sections['component_data'])
+        self._writeModdedComponents(sections['modded_components'])
+        self._writeCapacitorCharges(sections['capacitor_charges'])
+        self._writeCloakedUnits(sections['cloaked_units'])
+        self._writePoweredDownComponents(sections['powered_down_components'])
+        self._writeUnitEngineTrottles(sections['engine_trottles'])
+        self._writeUnitComponentCargoBlocks(sections['component_cargo'])
+        self._writeUnitShields(sections['shields'])
+        self._writeUnitComponentHealth(sections['component_health'])
+        self._writeActiveUnits(sections['active_units'])
+        self._writeUnitHealth(sections['health'])
+
+    def writeAllUnitData(self, units):
+        # Side tables are written in unit order, which is not always the order
+        # the game stored them in. Use readSave(raw=True) for exact output.
+        self.writeUnitSections(splitUnitData(units))
+
+    def writeSave(self, save, remaining=b'', raw=False):
+        self.writeHeader(save['header'])
+        self.writeDouble(save['seconds_eslapsed'])
+        self.writeSectors(save['sectors'])
+        self.writeFactions(save['factions'])
+        self.writePatrolPaths(save['patrol_paths'])
+        if raw:
+            self.writeFactionRelationBlocks(save['faction_relations'])
+        else:
+            self.writeFactionRelations(save['faction_relations'])
+        self.writeFactionOpinions(save['faction_opinions'])
+        if raw:
+            self.writeUnitSections(save['units'])
+        else:
+            self.writeAllUnitData(save['units'])
+        self.writeBytes(remaining)
+        return self.getValue()
+
+
+def _groupRuns(records, key) -> list:
+    blocks = []
+    for record in records:
+        if not blocks or blocks[-1][0] != record[key]:
+            blocks.append((record[key], []))
+        blocks[-1][1].append(record)
+    return blocks
+
+
+def mergeUnitData(units, tables) -> list:
+    # Merges the side tables into the units they belong to, as readAllUnitData returns
+    # them. tables maps the UNIT_SECTIONS names after units to iterables of their
+    # records, dicts or records.RecordSaveReader records, with component_cargo
+    # flattened as iterUnitComponentCargo yields it. The side records are moved into
+    # the units and the unit_id of the nested ones is removed.
+    units_by_id = {unit['id']: unit for unit in units}
+
+    for name in tables['names']:
+        unit = units_by_id.get(name['unit_id'])
+        if unit is not None:
+            unit['name'] = name['name']
+
+    for component in tables['component_data']:
+        unit = units_by_id.get(component.pop('unit_id'))
+        if unit is not None:
+            component['modded'] = []
+            component['offline'] = []
+            component['cargo'] = []
+            unit['component_data'] = component
+
+    for component in tables['modded_components']:
+        unit = units_by_id.get(component.pop('unit_id'))
+        if unit is not None:
+            unit['component_data']['modded'].append(component)
+
+    for capacitor in tables['capacitor_charges']:
+        unit = units_by_id.get(capacitor['unit_id'])
+        if unit is not None:
+            unit['component_data']['capacitor_charge'] = capacitor['capacitor_charge']
+
+    for unit_id in tables['cloaked_units']:
+        unit = units_by_id.get(unit_id)
+        if unit is not None:
+            unit['component_data']['cloaked'] = True
+
+    for component in tables['powered_down_components']:
+        unit = units_by_id.get(component['unit_id'])
+        if unit is not None:
+            unit['component_data']['offline'].append(component['bay_id'])
+
+    for trottle in tables['engine_trottles']:
+        unit = units_by_id.get(trottle['unit_id'])
+        if unit is not None:
+            unit['component_data']['trottle'] = trottle['trottle']
+
+    for cargo in tables['component_cargo']:
+        unit = units_by_id.get(cargo.pop('unit_id'))
+        if unit is not None:
+            unit['component_data']['cargo'].append(cargo)
+
+    for shield in tables['shields']:
+        unit = units_by_id.get(shield['unit_id'])
+        if unit is not None:
+            unit['component_data']['shield_data'] = shield['data']
+
+    for component in tables['component_health']:
+        unit = units_by_id.get(component['unit_id'])
+        if unit is not None:
+            unit['component_data']['component_health'] = component['component_health']
+
+    for active_unit in tables['active_units']:
+        unit = units_by_id.get(active_unit['unit_id'])
+        if unit is not None:
+            unit['component_data']['active_data'] = active_unit['active_data']
+
+    for health in tables['health']:
+        unit = units_by_id.get(health.pop('unit_id'))
+        if unit is not None:
+            unit['health'] = health
+    return units
+
+
+def splitUnitData(units) -> dict:
+    # Inverse of mergeUnitData
+    sections = {name: [] for name, _ in UNIT_SECTIONS}
+    sections['units'] = units
+    for unit in units:
+        unit_id = unit['id']
+        if 'name' in unit:
+            sections['names'].append({'unit_id': unit_id, 'name': unit['name']})
+
+        component_data = unit.get('component_data')
+        if component_data is not None:
+            sections['component_data'].append(dict(component_data, unit_id=unit_id))
+            for component in component_data['modded']:
+                sections['modded_components'].append(dict(component, unit_id=unit_id))
+            if 'capacitor_charge' in component_data:
+                sections['capacitor_charges'].append({'unit_id': unit_id, 'capacitor_charge': component_data['capacitor_charge']})
+            if component_data.get('cloaked'):
+                sections['cloaked_units'].append(unit_id)
+            for bay_id in component_data['offline']:
+                sections['powered_down_components'].append({'unit_id': unit_id, 'bay_id': bay_id})
+            if 'trottle' in component_data:
+                sections['engine_trottles'].append({'unit_id': unit_id, 'trottle': component_data['trottle']})
+            if component_data['cargo']:
+                sections['component_cargo'].append({'unit_id': unit_id, 'cargo': component_data['cargo']})
+            if 'shield_data' in component_data:
+                sections['shields'].append({'unit_id': unit_id, 'data': component_data['shield_data']})
+            if 'component_health' in component_data:
+                sections['component_health'].append({'unit_id': unit_id, 'component_health': component_data['component_health']})
+            if 'active_data' in component_data:
+                sections['active_units'].append({'unit_id': unit_id, 'active_data': component_data['active_data']})
+
+        if 'health' in unit:
+            sections['health'].append(dict(unit['health'], unit_id=unit_id))
+    return sections
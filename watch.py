@@ -0,0 +1,228 @@
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import sys
+import time
+from diff import diffSection, formatChanges, sectionRanges, unitSectionRanges, jsonChanges
+from sections import LazySaveReader
+from tools import SAVE_SECTIONS, UNIT_SECTIONS, mergeUnitData
+
+
+class _SaveState:
+    # The last decode of one save: its stat, the hash and value of every section, and
+    # the hash and records of every table of the unit section as stored
+    def __init__(self, stat):
+        self.stat = stat
+        self.hashes = {}
+        self.save = {}
+        self.unit_hashes = {}
+        self.unit_tables = {}
+
+
+def _groupByUnit(name, records) -> dict:
+    # Records of one of the UNIT_SECTIONS tables by unit id
+    groups = {}
+    for record in records:
+        if name == 'units':
+            unit_id = record['id']
+        elif name == 'cloaked_units':
+            unit_id = record
+        else:
+            unit_id = record['unit_id']
+        groups.setdefault(unit_id, []).append(record)
+    return groups
+
+
+def _changedUnitIds(name, old_records, new_records) -> set:
+    old_groups = _groupByUnit(name, old_records)
+    new_groups = _groupByUnit(name, new_records)
+    return {unit_id for unit_id in old_groups.keys() | new_groups.keys() if old_groups.get(unit_id) != new_groups.get(unit_id)}
+
+
+def _mergeUnits(tables, unit_ids) -> dict:
+    # Merged units of unit_ids by id. The records are copied first, as mergeUnitData
+    # moves them into the units and tables are reused by the next decode.
+    units = [dict(unit) for unit in tables['units'] if unit['id'] in unit_ids]
+    side_tables = {}
+    for name, _ in UNIT_SECTIONS[1:]:
+        records = tables[name]
+        if name == 'cloaked_units':
+            side_tables[name] = [unit_id for unit_id in records if unit_id in unit_ids]
+        elif name == 'component_cargo':
+            side_tables[name] = [
+                dict(cargo, unit_id=block['unit_id'])
+                for block in records if block['unit_id'] in unit_ids for cargo in block['cargo']
+            ]
+        else:
+            side_tables[name] = [dict(record) for record in records if record['unit_id'] in unit_ids]
+    return {unit['id']: unit for unit in mergeUnitData(units, side_tables)}
+
+
+# Polls a directory and decodes saves again when their size or modification time
+# changes. Sections whose bytes hash the same as in the previous decode are reused,
+# as are the tables of the unit section and the units they do not touch. Subscribers
+# are only called with the sections that changed, e.g.
+#   watcher = SaveWatcher('saves/', pattern='AutoSave*.dat')
+#   watcher.subscribe(lambda path, save, changes: print(path, changes))
+#   watcher.run()
+# changes is None for the first decode of a save, after that it is a change set
+# in the format of diff.diffReaders.
+class SaveWatcher:
+    def __init__(self, directory, pattern='*.dat', interval=1.0):
+        self.directory = directory
+        self.pattern = pattern
+        self.interval = interval
+        self.subscribers = []
+        self.states = {}
+        # Stat of saves whose last decode failed, they are tried again once it changes
+        self.failed = {}
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def _publish(self, path, save, changes):
+        for callback in list(self.subscribers):
+            callback(path, save, changes)
+
+    def _stats(self) -> dict:
+        stats = {}
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.is_file() and fnmatch.fnmatch(entry.name, self.pattern):
+                    stat = entry.stat()
+                    stats[entry.path] = (stat.st_size, stat.st_mtime_ns)
+        return stats
+
+    def _decode(self, path, stat, previous):
+        # Returns the new state and the change set, previous is None for a new save
+        with open(path, 'rb') as f:
+            data = f.read()
+        reader = LazySaveReader(data)
+        ranges = sectionRanges(reader)
+
+        state = _SaveState(stat)
+        changes = {}
+        for name, _ in SAVE_SECTIONS:
+            start, end = ranges[name]
+            section_hash = hashlib.blake2b(reader.data[start:end], digest_size=16).digest()
+            state.hashes[name] = section_hash
+            if previous is not None and previous.hashes[name] == section_hash:
+                state.save[name] = previous.save[name]
+                if name == 'units':
+                    state.unit_hashes = previous.unit_hashes
+                    state.unit_tables = previous.unit_tables
+                continue
+
+            if name == 'units':
+                section_changes = self._decodeUnits(reader, state, previous)
+            else:
+                state.save[name] = reader.readSection(name)
+                section_changes = None if previous is None else diffSection(name, previous.save[name], state.save[name])
+            if section_changes is not None:
+                changes[name] = section_changes
+        return state, (None if previous is None else changes)
+
+    def _decodeUnits(self, reader, state, previous):
+        # Decodes the tables of the unit section whose bytes changed, and merges and
+        # compares only the units they touch. Returns the change set of the units.
+        ranges = unitSectionRanges(reader)
+        changed_ids = set()
+        for name, method in UNIT_SECTIONS:
+            start, end = ranges[name]
+            table_hash = hashlib.blake2b(reader.data[start:end], digest_size=16).digest()
+            state.unit_hashes[name] = table_hash
+            if previous is not None and previous.unit_hashes[name] == table_hash:
+                state.unit_tables[name] = previous.unit_tables[name]
+                continue
+            reader.position = start
+            state.unit_tables[name] = list(getattr(reader, method)())
+            if previous is not None:
+                changed_ids |= _changedUnitIds(name, previous.unit_tables[name], state.unit_tables[name])
+
+        unit_records = state.unit_tables['units']
+        if previous is None:
+            merged = _mergeUnits(state.unit_tables, {unit['id'] for unit in unit_records})
+            state.save['units'] = [merged[unit['id']] for unit in unit_records]
+            return None
+
+        merged = _mergeUnits(state.unit_tables, changed_ids)
+        previous_units = {unit['id']: unit for unit in previous.save['units']}
+        state.save['units'] = [
+            merged[unit['id']] if unit['id'] in merged else previous_units[unit['id']] for unit in unit_records
+        ]
+        return diffSection(
+            'units',
+            [unit for unit in previous.save['units'] if unit['id'] in changed_ids],
+            [unit for unit in state.save['units'] if unit['id'] in changed_ids],
+        )
+
+    def poll(self) -> int:
+        # Checks the directory once, returns the number of saves that were decoded
+        stats = self._stats()
+        for path in list(self.states):
+            if path not in stats:
+                del self.states[path]
+        for path in list(self.failed):
+            if path not in stats:
+                del self.failed[path]
+
+        decoded = 0
+        for path, stat in stats.items():
+            previous = self.states.get(path)
+            if (previous is not None and previous.stat == stat) or self.failed.get(path) == stat:
+                continue
+            try:
+                state, changes = self._decode(path, stat, previous)
+            except Exception as e:
+                # The game can still be writing the file, it is tried again once its stat changes
+                print(f'FAILED {path}: {type(e).__name__}: {e}', file=sys.stderr)
+                self.failed[path] = stat
+                continue
+            self.failed.pop(path, None)
+            self.states[path] = state
+            decoded += 1
+            if changes is None or changes:
+                self._publish(path, state.save, changes)
+        return decoded
+
+    def run(self, polls=None):
+        # Polls until interrupted, or polls times
+        count = 0
+        try:
+            while polls is None or count < polls:
+                self.poll()
+                count += 1
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            pass
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Print what changes in Interstellar Pilot saves as they are written')
+    parser.add_argument('directory', help='directory containing the saves')
+    parser.add_argument('--pattern', default='AutoSave*.dat', help='file name pattern of the saves to watch')
+    parser.add_argument('--interval', type=float, default=1.0, help='seconds between polls')
+    parser.add_argument('--json', action='store_true', help='print each change set as one line of JSON')
+    args = parser.parse_args(argv)
+
+    def printChanges(path, save, changes):
+        if changes is None:
+            print(f"{path}: {len(save['units'])} units", flush=True)
+        elif args.json:
+            print(json.dumps({'save_file': path, 'changes': jsonChanges(changes)}), flush=True)
+        else:
+            print(f'{path}:\n{formatChanges(changes)}', flush=True)
+
+    watcher = SaveWatcher(args.directory, args.pattern, args.interval)
+    watcher.subscribe(printChanges)
+    watcher.run()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())